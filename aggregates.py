@@ -0,0 +1,244 @@
+import json
+import os
+import sys
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+from dataset import SNAPSHOT_PATH, iter_postings
+from skill_index import SKILL_COLUMNS, MATCH_SKILLS, build_skill_index, skill_mask
+
+
+AGGREGATES_PATH = './input_3.aggregates.json'
+# bumped whenever compute_aggregates gains or changes a key, so aggregates
+# stored by an older version are recomputed instead of read
+AGGREGATES_FORMAT = 2
+
+
+# named skill groups, a posting counts towards a group when it mentions any of
+# the group's skills
+SKILL_GROUPS = {
+    'programming': ['python', 'r', 'scala', 'programming'],
+    'etl': ['talend', 'dataiku', 'pentaho', 'snowflake', 'hive', 'spark', 'kafka', 'kinesis', 'etl'],
+    'visualization': ['matplotlib', 'seaborn', 'plotly', 'bokeh', 'tableau', 'redash', 'powerbi', 'data_visualization'],
+    'databases': ['mysql', 'postgresql', 'sql', 'mongodb', 'redis', 'sqlite', 'sql server', 'bigquery', 'nosql'],
+    'sql': ['mysql', 'postgresql', 'sql', 'sqlite', 'sql server'],
+    'nosql': ['mongodb', 'redis', 'nosql'],
+    'big query': ['bigquery'],
+}
+
+# three-set venn diagrams shown on the dashboard, each set is a skill group
+VENN_DIAGRAMS = {
+    'programming': {'python': ['python'], 'r': ['r'], 'scala': ['scala']},
+    'visualization': {'tableau': ['tableau'], 'redash': ['redash'], 'powerbi': ['powerbi']},
+    'databases': {name: SKILL_GROUPS[name] for name in ['sql', 'nosql', 'big query']},
+}
+
+# applicant_count histogram: 0, 1-19, then steps of 20 up to 200+, where
+# linkedin stops counting
+APPLICANT_EDGES = [1] + list(range(20, 201, 20))
+APPLICANT_LABELS = ['0', '1-19'] + [f"{start}-{start+19}" for start in range(20, 200, 20)] + ['200+']
+
+NOT_SPECIFIED = "Not-Specified"
+
+
+def group_membership(groups=SKILL_GROUPS, skills=SKILL_COLUMNS):
+    membership = np.zeros((len(skills), len(groups)), dtype=np.int32)
+    for g, members in enumerate(groups.values()):
+        for skill in members:
+            membership[skills.index(skill), g] = 1
+    return membership
+
+
+def skill_flags(patterns, skills=SKILL_COLUMNS):
+    # uint64 skill masks back to a boolean matrix, one row per mask
+    bits = np.unpackbits(patterns.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1, bitorder='little')
+    return bits[:, :len(skills)].astype(bool)
+
+
+def compute_skill_stats(patterns, counts, groups=SKILL_GROUPS, skills=SKILL_COLUMNS):
+    # every per-skill count, every "any of group" count and the skill x skill
+    # co-occurrence counts (X.T @ X) from the distinct skill masks and how
+    # many postings have each, one matrix product each
+    flags = skill_flags(patterns, skills).astype(np.int64)
+
+    skill_counts = counts @ flags
+    group_counts = counts @ ((flags @ group_membership(groups, skills)) > 0)
+    cooccurrence = flags.T @ (flags * counts[:, None])
+
+    return {
+        'rows': int(counts.sum()),
+        'skills': dict(zip(skills, skill_counts.tolist())),
+        'groups': dict(zip(groups, group_counts.tolist())),
+        # only pairs that occur together are stored, missing pairs are 0
+        'cooccurrence': {
+            skills[a]: {skills[b]: int(cooccurrence[a, b]) for b in np.flatnonzero(cooccurrence[a])}
+            for a in np.flatnonzero(np.diag(cooccurrence))
+        },
+    }
+
+
+def venn_regions(index, sets, skills=SKILL_COLUMNS, weights=None):
+    # region code of a posting has bit (n - 1 - i) set when it belongs to set i,
+    # which is the "101" style petal logic the venn package draws. one bincount
+    # over the codes sizes every region at once
+    n_sets = len(sets)
+    codes = np.zeros(len(index), dtype=np.int64)
+    for i, members in enumerate(sets.values()):
+        codes |= ((index & skill_mask(members, skills)) != 0).astype(np.int64) << (n_sets - 1 - i)
+
+    sizes = np.bincount(codes, weights=weights, minlength=2 ** n_sets)
+    return {bin(code)[2:].zfill(n_sets): int(sizes[code]) for code in range(1, 2 ** n_sets)}
+
+
+def build_features(data):
+    # per-posting codes every aggregate is counted from. postings are reduced
+    # to the id of their distinct skill mask, so skill, group, venn and
+    # signature counts cost O(distinct masks) once the postings are counted
+    index = build_skill_index(data)
+    patterns, pattern_ids = np.unique(index, return_inverse=True)
+    work_types = pd.Categorical(data['work_type'].astype(object).fillna(NOT_SPECIFIED))
+
+    applicants = np.asarray(data['applicant_count'], dtype=np.float64)
+    applicant_bins = np.digitize(applicants, APPLICANT_EDGES)
+    # missing counts go to an extra bin that is dropped when counting
+    applicant_bins[np.isnan(applicants)] = len(APPLICANT_LABELS)
+
+    return {
+        'rows': len(index),
+        'patterns': patterns,
+        'pattern_ids': pattern_ids.ravel(),
+        'work_type': (work_types.codes, list(work_types.categories)),
+        'applicants': applicant_bins,
+    }
+
+
+def aggregate_features(features, selection=None):
+    # aggregates of the postings picked by `selection` (a boolean mask over
+    # the postings, None for all of them), same layout as compute_aggregates
+    def pick(values):
+        return values if selection is None else values[selection]
+
+    counts = np.bincount(pick(features['pattern_ids']), minlength=len(features['patterns']))
+    present = counts > 0
+    patterns, counts = features['patterns'][present], counts[present]
+
+    signatures, inverse = np.unique(patterns & skill_mask(MATCH_SKILLS), return_inverse=True)
+    signature_counts = np.bincount(inverse.ravel(), weights=counts, minlength=len(signatures)).astype(np.int64)
+
+    codes, work_types = features['work_type']
+    work_type_counts = np.bincount(pick(codes), minlength=len(work_types))
+    applicants = np.bincount(pick(features['applicants']), minlength=len(APPLICANT_LABELS) + 1)
+
+    return dict(
+        compute_skill_stats(patterns, counts),
+        work_type={work_types[i]: int(work_type_counts[i]) for i in np.argsort(-work_type_counts, kind='stable') if work_type_counts[i]},
+        applicants=dict(zip(APPLICANT_LABELS, applicants[:len(APPLICANT_LABELS)].tolist())),
+        venn={name: venn_regions(patterns, sets, weights=counts) for name, sets in VENN_DIAGRAMS.items()},
+        signatures=dict(zip(signatures.tolist(), signature_counts.tolist())),
+    )
+
+
+def compute_aggregates(data):
+    # every number the dashboard charts need, as plain counts. all of them are
+    # additive, so the aggregates of two disjoint batches of postings can be
+    # combined with merge_aggregates instead of recounting both
+    return aggregate_features(build_features(data))
+
+
+def merge_aggregates(total, delta):
+    merged = {}
+    for key in list(total) + [key for key in delta if key not in total]:
+        current, change = total.get(key), delta.get(key)
+        if isinstance(current, dict) or isinstance(change, dict):
+            merged[key] = merge_aggregates(current or {}, change or {})
+        else:
+            merged[key] = (current or 0) + (change or 0)
+    return merged
+
+
+def freeze_aggregates(aggregates):
+    # read-only view of aggregates shared by every session, nested counts
+    # included
+    return MappingProxyType({key: freeze_aggregates(value) if isinstance(value, dict) else value for key, value in aggregates.items()})
+
+
+def stream_aggregates(chunks):
+    # folds a stream of posting frames into one set of aggregates, only one
+    # chunk is held in memory at a time
+    total = {}
+    for chunk in chunks:
+        total = merge_aggregates(total, compute_aggregates(chunk))
+    return total
+
+
+def signature_table(aggregates):
+    signatures = aggregates['signatures']
+    return (
+        np.fromiter(signatures.keys(), dtype=np.uint64, count=len(signatures)),
+        np.fromiter(signatures.values(), dtype=np.int64, count=len(signatures)),
+    )
+
+
+def cooccurrence_stats(aggregates, skills=SKILL_COLUMNS):
+    # skill x skill frames over the skills that occur at all: posting counts,
+    # P(column | row) and lift, P(row and column) / (P(row) * P(column)).
+    # the diagonal is left empty in the last two, it is 1 and 1 / P(skill)
+    pairs = aggregates['cooccurrence']
+    skills = [skill for skill in skills if skill in pairs]
+    counts = np.array([[pairs[a].get(b, 0) for b in skills] for a in skills], dtype=np.int64).reshape(len(skills), len(skills))
+
+    support = np.diag(counts).astype(np.float64)
+    conditional = counts / support[:, None]
+    lift = conditional * aggregates['rows'] / support[None, :]
+    np.fill_diagonal(conditional, np.nan)
+    np.fill_diagonal(lift, np.nan)
+
+    return {
+        name: pd.DataFrame(values, index=skills, columns=skills)
+        for name, values in [('count', counts), ('conditional', conditional), ('lift', lift)]
+    }
+
+
+def save_aggregates(aggregates, version, path=AGGREGATES_PATH):
+    stored = dict(aggregates, version=version, format=AGGREGATES_FORMAT, signatures=list(aggregates['signatures'].items()))
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(stored, file)
+    os.replace(tmp_path, path)
+
+
+def load_aggregates(version, path=AGGREGATES_PATH):
+    # stored aggregates are only valid for the dataset version they describe
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        stored = json.load(file)
+    if stored.pop('version', None) != version or stored.pop('format', None) != AGGREGATES_FORMAT:
+        return None
+    stored['signatures'] = {signature: count for signature, count in stored['signatures']}
+    return stored
+
+
+def current_aggregates(version, path=AGGREGATES_PATH, snapshot_path=SNAPSHOT_PATH):
+    aggregates = load_aggregates(version, path)
+    if aggregates is None:
+        aggregates = stream_aggregates(iter_postings(snapshot_path))
+        save_aggregates(aggregates, version, path)
+    return aggregates
+
+
+def _source_stamp(paths):
+    return ';'.join(f"{path}:{os.path.getmtime(path)}:{os.path.getsize(path)}" for path in paths)
+
+
+if __name__ == '__main__':
+    # out-of-core aggregation of a posting archive, e.g. several scrapes:
+    # python aggregates.py archive.json jakarta.csv bandung.arrow ...
+    if len(sys.argv) < 3:
+        sys.exit("usage: python aggregates.py <output.json> <postings.csv|.arrow> [...]")
+    output, sources = sys.argv[1], sys.argv[2:]
+    aggregates = stream_aggregates(chunk for source in sources for chunk in iter_postings(source))
+    save_aggregates(aggregates, _source_stamp(sources), output)
+    print(f"aggregated {aggregates['rows']} postings into {output}")
@@ -0,0 +1,185 @@
+import importlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import aggregate_features, build_features, compute_aggregates, cooccurrence_stats, signature_table, stream_aggregates
+from dataset import CSV_PATH, build_snapshot, dataset_version, freeze, iter_postings, load_postings
+from dedup import find_clusters, one_per_cluster
+from facets import build_facet_index, normalize_filters, select
+from geo import MAP_ZOOM, DETAIL_ZOOM, cluster_points, located
+from loadtest import RERUN_TIMEOUT, SCRIPT_PATH, TABS
+from precompute import precompute
+from profiling import reset_sections, section_metrics, startup_profile
+from regions import REGIONS_PATH
+from search import bm25_scores, build_search_index
+from skill_index import MATCH_SKILLS, build_signature_table, build_skill_index, best_missing_skill, match_scores, signature_matches, skill_mask, top_k
+from synthetic import generate_postings
+from timeline import build_timeline, trend
+
+
+DEFAULT_SCALES = [1, 10, 100]
+# fast functions are repeated and reported by median, builds run once
+REPEAT = 5
+
+HAVE = skill_mask(['python', 'pentaho', 'sql', 'communication'])
+FILTERS = normalize_filters({'city': ['Jakarta', 'Bandung'], 'work_type': ['On-site', 'Hybrid']})
+QUERY = 'sql dashboard a/b testing'
+
+
+def timed(func, repeat=REPEAT):
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        seconds.append(time.perf_counter() - start)
+    return result, seconds
+
+
+def time_page(csv_path, page_dir):
+    # renders server.py in a directory holding only the scale's postings, so
+    # it computes everything from them, then opens every other tab and the
+    # provinces layer. returns each section's first render, which computes
+    # it, the median of all its renders, and the page's exceptions
+    streamlit = importlib.import_module('streamlit')
+    AppTest = importlib.import_module('streamlit.testing.v1').AppTest
+    os.makedirs(page_dir)
+    shutil.copyfile(csv_path, os.path.join(page_dir, os.path.basename(CSV_PATH)))
+    shutil.copyfile(REGIONS_PATH, os.path.join(page_dir, os.path.basename(REGIONS_PATH)))
+
+    cwd = os.getcwd()
+    os.chdir(page_dir)
+    try:
+        streamlit.cache_data.clear()
+        streamlit.cache_resource.clear()
+        reset_sections()
+        app = AppTest.from_file(SCRIPT_PATH, default_timeout=RERUN_TIMEOUT).run()
+        for key, labels in TABS.items():
+            for label in labels[1:]:
+                app.session_state[key] = label
+                app.run()
+        app.radio(key='map_layer').set_value('Provinces').run()
+        errors = [exception.value for exception in app.exception]
+    finally:
+        os.chdir(cwd)
+
+    first = startup_profile()['sections']
+    sections = {
+        name: {'median': metrics['p50'], 'first': first[name]['seconds'], 'runs': metrics['renders']}
+        for name, metrics in section_metrics().items()
+    }
+    return sections, errors
+
+
+def benchmark_scale(base, scale, workdir, with_text=True):
+    # every timing of one dataset size, in the order the app runs them
+    csv_path = os.path.join(workdir, f"postings_{scale}.csv")
+    snapshot_path = os.path.join(workdir, f"postings_{scale}.arrow")
+    generate_postings(base, scale).to_csv(csv_path, index=False)
+
+    results = {}
+
+    def measure(name, func, repeat=REPEAT):
+        result, seconds = timed(func, repeat)
+        results[name] = {'median': float(np.median(seconds)), 'min': min(seconds), 'runs': len(seconds)}
+        return result
+
+    # data load
+    measure('build_snapshot', lambda: build_snapshot(csv_path, snapshot_path), repeat=1)
+    measure('dataset_version', lambda: dataset_version(csv_path, snapshot_path), repeat=1)
+    data = measure('load_postings', lambda: freeze(load_postings(None, csv_path, snapshot_path)))
+
+    # aggregates behind work_type, job_applicant and the v* charts
+    measure('compute_aggregates', lambda: compute_aggregates(data), repeat=1)
+    aggregates = measure('stream_aggregates', lambda: stream_aggregates(iter_postings(snapshot_path)), repeat=1)
+    features = measure('build_features', lambda: build_features(data), repeat=1)
+    measure('cooccurrence_stats', lambda: cooccurrence_stats(aggregates))
+
+    # sidebar filters
+    facet_index = measure('build_facet_index', lambda: build_facet_index(data), repeat=1)
+    mask = measure('select', lambda: select(facet_index, FILTERS))
+    measure('aggregate_features_filtered', lambda: aggregate_features(features, mask))
+
+    # load_map
+    points = located(data)
+    measure('cluster_points_overview', lambda: cluster_points(points['lat'], points['lng'], MAP_ZOOM))
+    measure('cluster_points_detail', lambda: cluster_points(points['lat'], points['lng'], DETAIL_ZOOM - 1))
+
+    # trend charts, from the per-partition aggregates
+    timeline_path = os.path.join(workdir, f"timeline_{scale}")
+    measure('build_timeline', lambda: build_timeline(path=timeline_path, csv_path=csv_path, snapshot_path=snapshot_path), repeat=1)
+    measure('trend_month', lambda: trend('month', path=timeline_path))
+
+    # how_many_jobs, next_skill and the best matches
+    index = build_skill_index(data)
+    measure('build_signature_table', lambda: build_signature_table(index, skill_mask(MATCH_SKILLS)), repeat=1)
+    table = signature_table(aggregates)
+    measure('signature_matches', lambda: signature_matches(table, HAVE))
+    measure('best_missing_skill', lambda: best_missing_skill(table, HAVE, MATCH_SKILLS))
+    measure('match_top_k', lambda: top_k(match_scores(features['patterns'], HAVE, skill_mask(MATCH_SKILLS))[features['pattern_ids']], 20))
+
+    if with_text:
+        descriptions = pd.read_csv(csv_path, usecols=['description'])['description']
+        search_index = measure('build_search_index', lambda: build_search_index([descriptions]), repeat=1)
+        measure('bm25_top_k', lambda: top_k(bm25_scores(search_index, QUERY), 20))
+        # synthetic descriptions are resampled, so dedup sees every copy of a
+        # base posting as a repost: its worst case of few, large clusters
+        clusters = measure('find_clusters', lambda: find_clusters(descriptions), repeat=1)
+        measure('one_per_cluster_filtered', lambda: one_per_cluster(clusters, mask))
+        # every task above and the text builds again, in a process pool
+        measure('precompute', lambda: precompute(csv_path, snapshot_path, os.path.join(workdir, f"precomputed_{scale}")), repeat=1)
+
+    # the page itself: how_many_jobs, load_map, the v* charts and every other
+    # section, timed by the app's own section() wrapper
+    sections, page_errors = time_page(csv_path, os.path.join(workdir, f"page_{scale}"))
+    results.update({f"page.{name}": timings for name, timings in sections.items()})
+
+    return {'scale': scale, 'rows': len(data), 'seconds': results, 'page_errors': page_errors}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def run(scales, with_text=True):
+    base = pd.read_csv(CSV_PATH)
+    with tempfile.TemporaryDirectory() as workdir:
+        runs = []
+        for scale in scales:
+            runs.append(benchmark_scale(base, scale, workdir, with_text))
+            print(f"scale {scale}: {runs[-1]['rows']} rows", file=sys.stderr)
+    return dict(environment(), runs=runs)
+
+
+if __name__ == '__main__':
+    # python benchmark.py <results.json> [scale ...] [--no-text]
+    # --no-text skips the description search and dedup builds, which take
+    # minutes at the largest scales
+    if len(sys.argv) < 2:
+        sys.exit("usage: python benchmark.py <results.json> [scale ...] [--no-text]")
+    arguments = sys.argv[2:]
+    with_text = '--no-text' not in arguments
+    scales = [float(scale) if '.' in scale else int(scale) for scale in arguments if scale != '--no-text'] or DEFAULT_SCALES
+
+    results = run(scales, with_text)
+    with open(sys.argv[1], 'w') as file:
+        json.dump(results, file, indent=2)
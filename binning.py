@@ -0,0 +1,70 @@
+import numpy as np
+
+from facets import age_days
+
+
+# numeric fields the page can break down: their label, the value linkedin
+# stops counting at (shown as "cap+"), and the default bucket width
+NUMERIC_FIELDS = {
+    'applicant_count': {'label': 'Applicants', 'cap': 200, 'width': 20},
+    'post_age_days': {'label': 'Posting age (days)', 'cap': None, 'width': 7},
+}
+PERCENTILES = (25, 50, 75, 90, 95)
+
+
+def numeric_values(data, field):
+    # float values of `field` for every posting, NaN where unknown
+    if field == 'post_age_days':
+        return age_days(data)
+    return np.asarray(data[field], dtype=np.float64)
+
+
+def uniform_edges(width, cap=None, upper=None):
+    # bucket edges 0, width, 2 * width, ... up to the cap, or past `upper`
+    # for uncapped fields
+    end = cap if cap is not None else (upper if upper is not None and np.isfinite(upper) else 0) + width
+    edges = np.arange(0, end + 1e-9, width).tolist()
+    if cap is not None and edges[-1] != cap:
+        edges.append(cap)
+    return tuple(edges)
+
+
+def bin_codes(values, edges):
+    # bucket of every value in one pass: 0 below edges[0], i for
+    # [edges[i - 1], edges[i]), len(edges) from the last edge on. unknown
+    # values get len(edges) + 1, a bucket bin_counts drops
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.digitize(values, edges)
+    codes[np.isnan(values)] = len(edges) + 1
+    return codes
+
+
+def bin_counts(codes, edges, selection=None):
+    # postings per bucket, one bincount over the (selected) codes
+    codes = codes if selection is None else codes[selection]
+    return np.bincount(codes, minlength=len(edges) + 2)[:len(edges) + 1]
+
+
+def bin_labels(edges, cap=None):
+    # "a-b" per bucket of whole numbers, the last one "cap+" for capped fields
+    def number(value):
+        return f"{value:g}"
+
+    labels = [f"<{number(edges[0])}"]
+    for low, high in zip(edges[:-1], edges[1:]):
+        labels.append(number(low) if high - low == 1 else f"{number(low)}-{number(high - 1)}")
+    labels.append(f"{number(edges[-1])}+" if cap is not None else f">={number(edges[-1])}")
+    return labels
+
+
+def percentiles(values, percents=PERCENTILES, cap=None, selection=None):
+    # percentiles of the known values, capped ones count as the cap
+    values = np.asarray(values, dtype=np.float64)
+    if selection is not None:
+        values = values[selection]
+    values = values[~np.isnan(values)]
+    if cap is not None:
+        values = np.minimum(values, cap)
+    if not len(values):
+        return {percent: None for percent in percents}
+    return dict(zip(percents, np.percentile(values, percents).tolist()))
@@ -0,0 +1,235 @@
+import fcntl
+import hashlib
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from skill_index import SKILL_COLUMNS
+
+
+CSV_PATH = './input_3.csv'
+SNAPSHOT_PATH = './input_3.arrow'
+
+ROLE_COLUMNS = ['data_analyst', 'bi_analyst', 'data_engineer', 'data_scientist', 'etl_developer', 'business_information', 'analyst']
+# large free-text columns, only read when a feature asks for them
+TEXT_COLUMNS = ['description']
+
+
+# applicant counts and role flags are nullable, a scrape can miss them
+SNAPSHOT_TYPES = dict(
+    {
+        'id': 'int64', 'applicant_count': 'Int64', 'work_type': 'category', 'lat': 'float32', 'lng': 'float32',
+        'posted_on': 'datetime64[s]', 'scraped_at': 'datetime64[s]',
+    },
+    **{column: 'Int8' for column in ROLE_COLUMNS},
+)
+
+# rows per frame when postings are streamed instead of loaded at once
+CHUNK_SIZE = 100_000
+
+# snapshot locks held by the current thread
+_held_locks = threading.local()
+
+
+def to_snapshot_types(frame):
+    # casts whichever of the known columns `frame` has
+    frame = frame.copy()
+    for column, dtype in SNAPSHOT_TYPES.items():
+        if column in frame:
+            frame[column] = frame[column].astype(dtype)
+    for column in SKILL_COLUMNS:
+        if column in frame:
+            frame[column] = frame[column].fillna(False).astype(bool)
+    return frame
+
+
+def _write_snapshot(table, snapshot_path):
+    # uncompressed arrow ipc so the dashboard can memory-map it, written to a
+    # temporary file first so a running app never sees a half written snapshot
+    tmp_path = snapshot_path + '.tmp'
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+def write_postings(frame, snapshot_path):
+    return _write_snapshot(pa.Table.from_pandas(to_snapshot_types(frame), preserve_index=False), snapshot_path)
+
+
+def build_snapshot(csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    return write_postings(pd.read_csv(csv_path), snapshot_path)
+
+
+def append_to_snapshot(frame, snapshot_path=SNAPSHOT_PATH):
+    # the stored rows are memory-mapped and written back as they are, only the
+    # new rows go through pandas
+    current = pa.ipc.open_file(pa.memory_map(snapshot_path)).read_all()
+    batch = pa.Table.from_pandas(to_snapshot_types(frame)[current.column_names], preserve_index=False)
+    table = pa.concat_tables([current, batch], promote_options='permissive').unify_dictionaries()
+    return _write_snapshot(table, snapshot_path)
+
+
+def snapshot_is_stale(csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    if not os.path.exists(snapshot_path):
+        return True
+    return os.path.exists(csv_path) and os.path.getmtime(csv_path) > os.path.getmtime(snapshot_path)
+
+
+@contextmanager
+def snapshot_lock(snapshot_path=SNAPSHOT_PATH):
+    # held by ingest.py from reading the postings to the last write, and by
+    # any rebuild of the snapshot or the timeline, so a rebuild never lands
+    # between the csv and the snapshot append and counts the batch twice. a
+    # thread already holding it just goes on
+    held = _held_locks.__dict__.setdefault('paths', set())
+    if snapshot_path in held:
+        yield
+        return
+    with open(snapshot_path + '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        held.add(snapshot_path)
+        try:
+            yield
+        finally:
+            held.discard(snapshot_path)
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def ensure_snapshot(csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    # rebuilds the snapshot when it is missing or older than the csv
+    if snapshot_is_stale(csv_path, snapshot_path):
+        with snapshot_lock(snapshot_path):
+            # checked again, an ingest may have written both files meanwhile
+            if snapshot_is_stale(csv_path, snapshot_path):
+                build_snapshot(csv_path, snapshot_path)
+    return snapshot_path
+
+
+def snapshot_stamp(csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    # cheap change marker for the snapshot, checked on every rerun
+    stat = os.stat(ensure_snapshot(csv_path, snapshot_path))
+    return stat.st_mtime_ns, stat.st_size
+
+
+def snapshot_version(snapshot_path=SNAPSHOT_PATH):
+    # content hash of a snapshot file
+    digest = hashlib.blake2b(digest_size=16)
+    with open(snapshot_path, 'rb') as snapshot:
+        for chunk in iter(lambda: snapshot.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def dataset_version(csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    # content hash of the snapshot, used to key anything derived from the data
+    return snapshot_version(ensure_snapshot(csv_path, snapshot_path))
+
+
+def read_postings(snapshot_path, columns=None):
+    # postings of a snapshot file as is, without checking it against a csv
+    table = pa.ipc.open_file(pa.memory_map(snapshot_path)).read_all()
+    if columns is None:
+        columns = [name for name in table.column_names if name not in TEXT_COLUMNS]
+    # split_blocks keeps one array per column instead of copying them into
+    # consolidated 2d blocks
+    return table.select(columns).to_pandas(split_blocks=True)
+
+
+def load_postings(columns=None, csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    return read_postings(ensure_snapshot(csv_path, snapshot_path), columns)
+
+
+def save_arrays(arrays, version, path):
+    # named arrays derived from the postings, stored with the version they
+    # were computed from. written through a file object, np.savez would
+    # append .npz to the tmp name
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        np.savez(file, version=np.array(version), **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_arrays(version, path):
+    # read-only arrays stored for `version`, None when there are none or they
+    # were computed from another version
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as stored:
+        if str(stored['version']) != version:
+            return None
+        arrays = {name: stored[name] for name in stored.files if name != 'version'}
+    for values in arrays.values():
+        values.flags.writeable = False
+    return arrays
+
+
+def current_arrays(version, path, compute):
+    # stored arrays of `version`, computed and stored first when missing
+    arrays = load_arrays(version, path)
+    if arrays is None:
+        save_arrays(compute(), version, path)
+        arrays = load_arrays(version, path)
+    return arrays
+
+
+def _read_only(values):
+    values = np.asarray(values)
+    values.flags.writeable = False
+    return values
+
+
+def freeze(frame):
+    # rebuilds `frame` on read-only column buffers, without consolidating them,
+    # so a frame shared by every session can't be changed in place by any of them
+    columns = {}
+    for name in frame.columns:
+        column = frame[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            values = pd.Categorical.from_codes(_read_only(column.cat.codes.to_numpy()), dtype=column.dtype)
+        elif isinstance(column.array, (pd.arrays.IntegerArray, pd.arrays.FloatingArray, pd.arrays.BooleanArray)):
+            # nullable columns are a values and a missing mask buffer, both
+            # made read-only
+            values = type(column.array)(
+                _read_only(column.to_numpy(dtype=column.dtype.numpy_dtype, na_value=0)),
+                _read_only(column.isna().to_numpy()),
+            )
+        elif isinstance(column.dtype, np.dtype):
+            values = _read_only(column.to_numpy())
+        else:
+            # an assignment swaps an arrow backed array for a new one instead
+            # of writing into it, so strings and other extension columns are
+            # kept as read-only object arrays
+            values = pd.Series(_read_only(column.to_numpy(dtype=object)), index=frame.index, dtype=object, copy=False)
+        columns[name] = values
+    return pd.DataFrame(columns, index=frame.index, copy=False)
+
+
+def iter_postings(path=SNAPSHOT_PATH, columns=None, chunk_size=CHUNK_SIZE):
+    # postings from a csv or an arrow snapshot as frames of at most chunk_size
+    # rows, so peak memory stays the same however large the source is. text
+    # columns are skipped unless asked for
+    if path.endswith('.csv'):
+        usecols = columns if columns is not None else (lambda name: name not in TEXT_COLUMNS)
+        for chunk in pd.read_csv(path, usecols=usecols, chunksize=chunk_size):
+            yield to_snapshot_types(chunk)
+        return
+
+    table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+    if columns is None:
+        columns = [name for name in table.column_names if name not in TEXT_COLUMNS]
+    table = table.select(columns)
+    for offset in range(0, table.num_rows, chunk_size):
+        yield table.slice(offset, chunk_size).to_pandas(split_blocks=True)
+
+
+if __name__ == '__main__':
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else CSV_PATH
+    snapshot_path = sys.argv[2] if len(sys.argv) > 2 else SNAPSHOT_PATH
+    with snapshot_lock(snapshot_path):
+        print(f"wrote {build_snapshot(csv_path, snapshot_path)}")
@@ -0,0 +1,139 @@
+import sys
+import zlib
+
+import numpy as np
+
+from dataset import SNAPSHOT_PATH, current_arrays, dataset_version, iter_postings
+from search import tokenize
+
+
+CLUSTERS_PATH = './input_3.clusters.npz'
+
+# descriptions are compared as sets of 3-word shingles
+SHINGLE_SIZE = 3
+# 64 minhash permutations split into 8 lsh bands of 8 rows: two descriptions
+# become candidates when a whole band agrees, likely from ~0.77 jaccard on
+NUM_PERM = 64
+BANDS = 8
+# candidates count as the same posting above this estimated jaccard
+DUPLICATE_THRESHOLD = 0.8
+# descriptions hashed per batch, and permutations per pass over a batch, to
+# bound the size of the (permutations x shingles) hash matrix
+MINHASH_BATCH = 2000
+PERM_BLOCK = 16
+
+# largest prime below 2 ** 32, so hashes fit uint32 and a * x + b can't
+# overflow uint64 with a < 2 ** 31
+_PRIME = np.uint64(4294967291)
+_EMPTY = np.uint32(0xFFFFFFFF)
+_random = np.random.default_rng(20230601)
+_A = _random.integers(1, 2 ** 31, NUM_PERM, dtype=np.uint64)
+_B = _random.integers(0, 2 ** 31, NUM_PERM, dtype=np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    # uint64 hash of every run of `size` consecutive tokens, a shorter text is
+    # one shingle. crc32 keeps the token hashes stable across processes
+    tokens = np.array([zlib.crc32(token.encode()) for token in tokenize(text, parts=False)], dtype=np.uint64)
+    if len(tokens) == 0:
+        return tokens
+    size = min(size, len(tokens))
+
+    hashed = np.zeros(len(tokens) - size + 1, dtype=np.uint64)
+    for offset in range(size):
+        hashed = hashed * np.uint64(1000003) ^ tokens[offset:offset + len(hashed)]
+    return np.unique(hashed)
+
+
+def minhash_signatures(shingle_sets, num_perm=NUM_PERM):
+    # one row of `num_perm` minhashes per shingle set, all sets of a batch in
+    # one array pass per permutation block. empty sets get the _EMPTY row
+    signatures = np.full((len(shingle_sets), num_perm), _EMPTY, dtype=np.uint32)
+    for start in range(0, len(shingle_sets), MINHASH_BATCH):
+        batch = shingle_sets[start:start + MINHASH_BATCH]
+        lengths = np.array([len(values) for values in batch])
+        rows = start + np.flatnonzero(lengths)
+        if not len(rows):
+            continue
+
+        values = np.concatenate([values for values in batch if len(values)]) % _PRIME
+        offsets = np.concatenate([[0], np.cumsum(lengths[lengths > 0])[:-1]])
+        for block in range(0, num_perm, PERM_BLOCK):
+            a, b = _A[block:block + PERM_BLOCK, None], _B[block:block + PERM_BLOCK, None]
+            hashed = (values * a + b) % _PRIME
+            signatures[rows, block:block + PERM_BLOCK] = np.minimum.reduceat(hashed, offsets, axis=1).T
+    return signatures
+
+
+def lsh_candidates(signatures, bands=BANDS):
+    # pairs of postings that agree on every row of at least one band. within a
+    # bucket every member is paired with its first posting only, which is
+    # enough to connect the bucket and keeps the pair count linear
+    rows = signatures.shape[1] // bands
+    valid = np.flatnonzero(signatures[:, 0] != _EMPTY)
+    pairs = []
+    for band in range(bands):
+        keys = np.zeros(len(valid), dtype=np.uint64)
+        for column in range(band * rows, (band + 1) * rows):
+            keys = keys * np.uint64(0x100000001B3) ^ signatures[valid, column].astype(np.uint64)
+
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        starts = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+        first = np.maximum.accumulate(np.where(starts, np.arange(len(order)), 0))
+        pairs.append(np.stack([valid[order[first[~starts]]], valid[order[~starts]]], axis=1))
+
+    pairs = np.concatenate(pairs) if pairs else np.zeros((0, 2), dtype=np.int64)
+    return np.unique(pairs, axis=0)
+
+
+def connected_components(n, pairs):
+    # label of every node is the smallest node it is connected to, by
+    # propagating minimum labels over the pairs and pointer jumping
+    labels = np.arange(n)
+    if not len(pairs):
+        return labels
+    left, right = pairs[:, 0], pairs[:, 1]
+    while True:
+        previous = labels.copy()
+        np.minimum.at(labels, right, labels[left])
+        np.minimum.at(labels, left, labels[right])
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def find_clusters(descriptions):
+    # cluster id per posting: the row of the first posting with a near
+    # duplicate description, or its own row when it has none
+    signatures = minhash_signatures([shingles(text) for text in descriptions])
+    pairs = lsh_candidates(signatures)
+    agreement = (signatures[pairs[:, 0]] == signatures[pairs[:, 1]]).mean(axis=1)
+    return connected_components(len(signatures), pairs[agreement >= DUPLICATE_THRESHOLD]).astype(np.int32)
+
+
+def one_per_cluster(clusters, selection=None):
+    # boolean mask keeping the first selected posting of every cluster, so
+    # counting it counts distinct postings instead of reposts
+    if selection is None:
+        return clusters == np.arange(len(clusters))
+    rows = np.flatnonzero(selection)
+    _, first = np.unique(clusters[rows], return_index=True)
+    mask = np.zeros(len(clusters), dtype=bool)
+    mask[rows[first]] = True
+    return mask
+
+
+def cluster_arrays(snapshot_path=SNAPSHOT_PATH):
+    descriptions = (text for chunk in iter_postings(snapshot_path, columns=['description']) for text in chunk['description'])
+    return {'clusters': find_clusters(descriptions)}
+
+
+def current_clusters(version, path=CLUSTERS_PATH, snapshot_path=SNAPSHOT_PATH):
+    return current_arrays(version, path, lambda: cluster_arrays(snapshot_path))['clusters']
+
+
+if __name__ == '__main__':
+    clusters = current_clusters(dataset_version(*sys.argv[1:2]))
+    distinct = len(np.unique(clusters))
+    print(f"{len(clusters)} postings, {distinct} distinct, {len(clusters) - distinct} near duplicates")
@@ -0,0 +1,153 @@
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from skill_index import SKILL_COLUMNS
+
+
+# keywords per skill column, matched case-insensitively on word boundaries.
+# a trailing * also matches any word ending (deploy* matches deployment).
+# a keyword listed under several columns sets all of them
+SKILL_KEYWORDS = {
+    'python': ['python'],
+    'r': ['r'],
+    'scala': ['scala'],
+    'mysql': ['mysql'],
+    'postgresql': ['postgre*'],
+    'sql': ['sql', 'sql server'],
+    'mongodb': ['mongodb', 'mongo'],
+    'redis': ['redis'],
+    'sqlite': ['sqlite'],
+    'sql server': ['sql server'],
+    'bigquery': ['bigquery', 'big query'],
+    'nosql': ['nosql', 'no sql', 'no-sql'],
+    'talend': ['talend'],
+    'dataiku': ['dataiku'],
+    'pentaho': ['pentaho'],
+    'snowflake': ['snowflake'],
+    'hive': ['hive'],
+    'spark': ['spark', 'pyspark'],
+    'kafka': ['kafka'],
+    'kinesis': ['kinesis'],
+    'aws': ['aws', 'amazon', 'redshift'],
+    'gcp': ['gcp', 'google cloud'],
+    'azure': ['azure'],
+    'kubernetes': ['kubernetes', 'k8s'],
+    'docker': ['docker'],
+    'hadoop': ['hadoop'],
+    'excel': ['excel'],
+    'powerpoint': ['powerpoint', 'power point'],
+    'word': ['word', 'ms word', 'microsoft word'],
+    'pdf': ['pdf'],
+    'csv': ['csv'],
+    'sheet': ['sheet', 'sheets'],
+    'matplotlib': ['matplotlib'],
+    'seaborn': ['seaborn'],
+    'plotly': ['plotly'],
+    'bokeh': ['bokeh'],
+    'd3js': ['d3js', 'd3.js'],
+    'redash': ['redash'],
+    'tableau': ['tableau'],
+    'powerbi': ['powerbi', 'power bi', 'power-bi'],
+    'data_visualization': ['visualization', 'visualisasi', 'visualize'],
+    'data_mining': ['data mining', 'mining'],
+    'communication': ['communication*', 'komunikasi'],
+    'deployment': ['deploy*'],
+    'data_scraping': ['scraping', 'web scraping', 'data scraping'],
+    'programming': ['programming', 'program', 'pemrograman', 'coding'],
+    'english': ['english', 'bahasa inggris'],
+    'etl': ['etl'],
+    'git': ['git', 'github', 'gitlab'],
+}
+
+_BOUNDARY = '[a-z0-9_]'
+
+
+def compile_matcher(keywords=SKILL_KEYWORDS, columns=SKILL_COLUMNS):
+    # every keyword of every column goes into one pattern, so a description is
+    # scanned once no matter how many keywords there are. the keywords are
+    # merged into a character trie, so at each word start the regex engine
+    # follows one branch instead of trying every keyword in turn
+    targets = {}
+    for column, words in keywords.items():
+        for word in words:
+            targets.setdefault(word.lower(), []).append(columns.index(column))
+
+    trie = {}
+    groups = {}
+    for i, word in enumerate(targets):
+        node = trie
+        for char in word.rstrip('*'):
+            node = node.setdefault(char, {})
+        # an empty named group marks where a keyword ends, match.lastgroup
+        # then tells which keyword matched
+        node['*' if word.endswith('*') else ''] = f"k{i}"
+        groups[f"k{i}"] = targets[word]
+
+    pattern = re.compile(f"(?<!{_BOUNDARY}){_trie_pattern(trie)}(?!{_BOUNDARY})", re.IGNORECASE)
+    return pattern, groups
+
+
+def _trie_pattern(node):
+    branches = []
+    for char, child in sorted(node.items()):
+        if char not in ('', '*'):
+            branches.append((r'\s+' if char == ' ' else re.escape(char)) + _trie_pattern(child))
+    # longer keywords are tried before a keyword ending here, so "sql server"
+    # wins over "sql"
+    if '*' in node:
+        branches.append(f"{_BOUNDARY}*(?P<{node['*']}>)")
+    if '' in node:
+        branches.append(f"(?P<{node['']}>)")
+    return branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+
+
+_MATCHER = compile_matcher()
+
+
+def _extract_chunk(descriptions):
+    pattern, targets = _MATCHER
+    flags = np.zeros((len(descriptions), len(SKILL_COLUMNS)), dtype=bool)
+    for row, description in enumerate(descriptions):
+        if not isinstance(description, str):
+            continue
+        for group in {match.lastgroup for match in pattern.finditer(description)}:
+            flags[row, targets[group]] = True
+    return flags
+
+
+def extract_skills(descriptions, workers=None, chunk_size=5000):
+    # descriptions -> boolean frame with exactly the skill columns server.py
+    # reads. large batches are split over a process pool
+    descriptions = list(descriptions)
+    chunks = [descriptions[start:start + chunk_size] for start in range(0, len(descriptions), chunk_size)]
+
+    if len(chunks) <= 1 or workers == 1:
+        flags = [_extract_chunk(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+            flags = list(pool.map(_extract_chunk, chunks))
+
+    flags = np.concatenate(flags) if flags else np.zeros((0, len(SKILL_COLUMNS)), dtype=bool)
+    return pd.DataFrame(flags, columns=SKILL_COLUMNS)
+
+
+def add_skill_columns(postings, workers=None):
+    skills = extract_skills(postings['description'], workers=workers)
+    skills.index = postings.index
+
+    # same layout as input_3.csv: posting fields, skill flags, then coordinates
+    others = [column for column in postings.columns if column not in SKILL_COLUMNS]
+    coordinates = [column for column in others if column in ('lat', 'lng')]
+    fields = [column for column in others if column not in coordinates]
+    return pd.concat([postings[fields], skills, postings[coordinates]], axis=1)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        sys.exit("usage: python extract_skills.py <scrape.csv> <output.csv>")
+    add_skill_columns(pd.read_csv(sys.argv[1])).to_csv(sys.argv[2], index=False)
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+from aggregates import NOT_SPECIFIED
+
+
+# sidebar label per facet, in the order the filters are shown
+FACET_LABELS = {
+    'city': 'City',
+    'province': 'Province',
+    'work_type': 'Work type',
+    'company': 'Company',
+    'posted': 'Posted',
+}
+
+COUNTRY = 'Indonesia'
+
+# "3 weeks ago" style post dates, converted to days
+AGE_UNITS = {'hour': 1 / 24, 'day': 1, 'week': 7, 'month': 30, 'year': 365}
+# upper bound in days (inclusive) of every post date bucket but the last
+POST_AGE_EDGES = [1, 7, 30, 90]
+POST_AGE_LABELS = ['Past 24 hours', 'Past week', 'Past month', 'Past 3 months', 'Older']
+
+
+def post_age_days(post_date):
+    # NaN where the text isn't a relative date. there are only a few distinct
+    # texts, so each is parsed once
+    codes, texts = pd.factorize(pd.Series(post_date, dtype=object))
+    parts = pd.Series(texts, dtype=object).astype(str).str.extract(r'(\d+)\s+(hour|day|week|month|year)s?\s+ago', expand=True)
+    days = parts[0].astype(float).to_numpy() * parts[1].map(AGE_UNITS).astype(float).to_numpy()
+    # factorize marks missing values with -1, which picks the NaN appended here
+    return np.append(days, np.nan)[codes]
+
+
+def posted_on(post_date, scraped_at):
+    # day every posting went up: the scrape day minus its relative post date,
+    # NaT where the text can't be parsed. "1 month ago" is as coarse as
+    # linkedin shows it, counted as 30 days. postings are dated once, when
+    # they are scraped, and the date is stored with them
+    ages = pd.to_timedelta(post_age_days(post_date), unit='D')
+    return pd.Series(pd.Timestamp(scraped_at) - ages).dt.floor('D')
+
+
+def age_days(data):
+    # days between the stored posted_on and scraped_at dates, NaN where the
+    # posting couldn't be dated
+    ages = (pd.Series(data['scraped_at']) - pd.Series(data['posted_on'])) / pd.Timedelta(days=1)
+    return ages.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def split_location(location):
+    # "City, Province, Indonesia" -> (city, province). the country is dropped,
+    # a location with a single part counts as both city and province
+    parts = [part.strip() for part in location.split(',')] if isinstance(location, str) else []
+    if parts and parts[-1] == COUNTRY:
+        parts = parts[:-1]
+    if not parts:
+        return NOT_SPECIFIED, NOT_SPECIFIED
+    return parts[0], parts[1] if len(parts) > 1 else parts[0]
+
+
+def facet_values(data):
+    # one label per posting for every facet
+    codes, locations = pd.factorize(pd.Series(data['location'], dtype=object))
+    locations = [split_location(location) for location in locations]
+    cities = np.array([city for city, _ in locations] + [NOT_SPECIFIED], dtype=object)
+    provinces = np.array([province for _, province in locations] + [NOT_SPECIFIED], dtype=object)
+
+    ages = age_days(data)
+    posted = np.array(POST_AGE_LABELS + [NOT_SPECIFIED], dtype=object)[
+        np.where(np.isnan(ages), len(POST_AGE_LABELS), np.digitize(ages, POST_AGE_EDGES, right=True))
+    ]
+
+    return {
+        # factorize marks missing values with -1, the last label above
+        'city': cities[codes],
+        'province': provinces[codes],
+        'work_type': data['work_type'].astype(object).fillna(NOT_SPECIFIED).to_numpy(),
+        'company': data['company'].astype(object).fillna(NOT_SPECIFIED).to_numpy(),
+        'posted': posted,
+    }
+
+
+def build_facet_index(data):
+    # inverted index per facet: the postings of value i are
+    # positions[offsets[i]:offsets[i + 1]], values ordered by posting count.
+    # filtering then only touches the postings of the selected values
+    facets = {}
+    for facet, values in facet_values(data).items():
+        codes, labels = pd.factorize(values)
+        counts = np.bincount(codes, minlength=len(labels))
+        order = np.argsort(-counts, kind='stable')
+        codes = np.argsort(order)[codes]
+
+        positions = np.argsort(codes, kind='stable').astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(counts[order])])
+        for array in (positions, offsets):
+            array.flags.writeable = False
+
+        facets[facet] = {
+            'values': [labels[i] for i in order],
+            'codes': {labels[i]: code for code, i in enumerate(order)},
+            'positions': positions,
+            'offsets': offsets,
+        }
+    return {'rows': len(data), 'facets': facets}
+
+
+def normalize_filters(selected):
+    # {facet: [values]} -> hashable filters, facets without a selection are
+    # dropped and order doesn't matter, so equal selections share cache entries
+    return tuple(sorted((facet, tuple(sorted(values))) for facet, values in selected.items() if values))
+
+
+def select(index, filters):
+    # boolean mask of the postings matching `filters`: any selected value of a
+    # facet, and every facet. None when nothing is filtered
+    selection = None
+    for facet, values in filters:
+        facet_index = index['facets'][facet]
+        positions, offsets = facet_index['positions'], facet_index['offsets']
+
+        mask = np.zeros(index['rows'], dtype=bool)
+        for value in values:
+            code = facet_index['codes'].get(value)
+            if code is not None:
+                mask[positions[offsets[code]:offsets[code + 1]]] = True
+        selection = mask if selection is None else selection & mask
+    return selection
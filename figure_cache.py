@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+from profiling import lazy_import, note
+
+
+# total size of the cached figure json across the whole process
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+_figures = OrderedDict()
+_lock = threading.Lock()
+_size = 0
+_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+
+def _get(key):
+    with _lock:
+        if key not in _figures:
+            _stats['misses'] += 1
+            return None
+        _figures.move_to_end(key)
+        _stats['hits'] += 1
+        return _figures[key]
+
+
+def _entry_size(entry):
+    return sum(len(part) for part in entry[1])
+
+
+def _put(key, entry):
+    global _size
+    size = _entry_size(entry)
+    if size > MAX_CACHE_BYTES:
+        return
+
+    with _lock:
+        if key in _figures:
+            return
+        _figures[key] = entry
+        _size += size
+        # least recently used figures go first
+        while _size > MAX_CACHE_BYTES:
+            _, evicted = _figures.popitem(last=False)
+            _size -= _entry_size(evicted)
+            _stats['evictions'] += 1
+
+
+def cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_figures), bytes=_size)
+
+
+def cached_figure(version):
+    # caches a chart function's plotly figure(s) as json, keyed by the dataset
+    # version, the function and its arguments. the cache lives at module level
+    # so it is shared by every session in the process, and every caller gets
+    # its own figure rebuilt from the json, never a shared object
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (version(), func.__module__, func.__qualname__, _freeze(args), _freeze(kwargs))
+
+            entry = _get(key)
+            if entry is None:
+                figures = func(*args, **kwargs)
+                many = isinstance(figures, tuple)
+                entry = (many, tuple(figure.to_json() for figure in (figures if many else (figures,))))
+                _put(key, entry)
+                note(cache_misses=1, payload_bytes=_entry_size(entry))
+                return figures
+
+            note(cache_hits=1, payload_bytes=_entry_size(entry))
+            many, payload = entry
+            pio = lazy_import('plotly.io')
+            figures = tuple(pio.from_json(part) for part in payload)
+            return figures if many else figures[0]
+        return wrapper
+    return decorator
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = tuple(_freeze(item) for item in value)
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else items
+    return value
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+
+MAP_CENTER = [-2.945311, 119.579316]
+MAP_ZOOM = 5
+# width of a cluster cell at zoom 0 in degrees, halved on every zoom level
+CLUSTER_CELL_DEGREES = 90.0
+# from this zoom level on the map shows single postings instead of clusters
+DETAIL_ZOOM = 11
+
+
+def located(data, columns=('id',)):
+    # drop postings without coordinates as whole rows, so ids and coordinates
+    # stay aligned
+    columns = list(columns) + ['lat', 'lng']
+    return data.loc[data['lat'].notna() & data['lng'].notna(), columns]
+
+
+def cluster_points(lat, lng, zoom):
+    # snap every point to a grid cell sized for `zoom` and collapse each
+    # occupied cell to its centroid and posting count
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    cell = CLUSTER_CELL_DEGREES / 2 ** zoom
+
+    rows = np.floor((lat + 90.0) / cell).astype(np.int64)
+    cols = np.floor((lng + 180.0) / cell).astype(np.int64)
+    _, inverse, counts = np.unique(rows * (int(360.0 / cell) + 1) + cols, return_inverse=True, return_counts=True)
+
+    return pd.DataFrame({
+        'lat': np.bincount(inverse, weights=lat) / counts,
+        'lng': np.bincount(inverse, weights=lng) / counts,
+        'count': counts,
+    })
+
+
+def within_bounds(points, bounds):
+    # bounds as returned by st_folium: {'_southWest': {lat, lng}, '_northEast': {lat, lng}}
+    south_west, north_east = bounds['_southWest'], bounds['_northEast']
+    inside = (
+        points['lat'].between(south_west['lat'], north_east['lat'])
+        & points['lng'].between(south_west['lng'], north_east['lng'])
+    )
+    return points[inside]
@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pandas as pd
+
+from aggregates import AGGREGATES_PATH, compute_aggregates, load_aggregates, merge_aggregates, save_aggregates, stream_aggregates
+from dataset import CSV_PATH, SNAPSHOT_PATH, ROLE_COLUMNS, append_to_snapshot, dataset_version, iter_postings, load_postings, snapshot_lock, to_snapshot_types
+from extract_skills import add_skill_columns
+from facets import posted_on
+from skill_index import SKILL_COLUMNS
+from timeline import TIMELINE_PATH, add_postings, ensure_timeline, stamp_timeline
+
+
+def prepare_batch(batch, columns):
+    # a fresh scrape only has the raw posting fields, derive the rest and
+    # order everything like the stored csv
+    if not set(SKILL_COLUMNS) <= set(batch.columns):
+        batch = add_skill_columns(batch)
+    batch = batch.assign(**{column: 0 for column in ROLE_COLUMNS if column not in batch.columns})
+    return batch.reindex(columns=columns)
+
+
+def ingest(batch, scraped_at=None, csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH, aggregates_path=AGGREGATES_PATH, timeline_path=TIMELINE_PATH):
+    # `scraped_at` is when the batch was scraped, its relative post dates are
+    # counted back from it and both dates are stored with every posting. now
+    # when not given
+    scraped_at = (pd.Timestamp.now() if scraped_at is None else pd.Timestamp(scraped_at)).floor('D')
+    # everything from reading the stored postings to the last write happens
+    # under the snapshot lock
+    with snapshot_lock(snapshot_path):
+        stored_ids = load_postings(['id'], csv_path, snapshot_path)['id']
+        # the stored postings are partitioned before the batch is appended, so
+        # the first partitioning doesn't count the batch on top of add_postings
+        ensure_timeline(timeline_path, csv_path, snapshot_path)
+        aggregates = load_aggregates(dataset_version(csv_path, snapshot_path), aggregates_path)
+        if aggregates is None:
+            aggregates = stream_aggregates(iter_postings(snapshot_path))
+
+        # reposted ids keep their latest copy within the batch, ids that are
+        # already stored are skipped
+        batch = batch.drop_duplicates('id', keep='last')
+        batch = batch[~batch['id'].isin(stored_ids)]
+        if batch.empty:
+            return 0
+
+        batch = batch.assign(posted_on=posted_on(batch['post_date'], scraped_at).to_numpy(), scraped_at=scraped_at)
+        batch = prepare_batch(batch, pd.read_csv(csv_path, nrows=0).columns)
+        delta = compute_aggregates(to_snapshot_types(batch))
+
+        # the csv stays the source of truth, the snapshot is written after it so
+        # it isn't considered stale and rebuilt from scratch
+        batch.to_csv(csv_path, mode='a', header=False, index=False)
+        append_to_snapshot(batch, snapshot_path)
+        add_postings(to_snapshot_types(batch), timeline_path)
+        version = dataset_version(csv_path, snapshot_path)
+        stamp_timeline(version, timeline_path)
+        save_aggregates(merge_aggregates(aggregates, delta), version, aggregates_path)
+    return len(batch)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.exit("usage: python ingest.py <scrape.csv> [<scrape.csv> ...]")
+    for path in sys.argv[1:]:
+        # a scrape file's modification time stands in for its scrape time
+        scraped_at = pd.Timestamp(os.path.getmtime(path), unit='s')
+        print(f"{path}: {ingest(pd.read_csv(path), scraped_at)} new postings")
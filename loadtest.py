@@ -0,0 +1,148 @@
+import contextlib
+import importlib
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from skill_index import CORE_SKILLS, SOFT_SKILLS
+
+
+SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server.py')
+# a single rerun taking longer than this counts as a failure
+RERUN_TIMEOUT = 300
+
+# held for the whole load test, see share_runtime
+_config_override = None
+
+TABS = {
+    'programming_tab': ["Pie Chart", "Bar Plot", "Venn Diagram"],
+    'etl_tab': ["Pie Chart", "Bar Plot"],
+    'visualization_tab': ["Pie Chart", "Bar Plot", "Venn Diagram"],
+    'databases_tab': ["Pie Chart", "Bar Plot", "Venn Diagram", "SQL Bar Plot"],
+    'other_skills_tab': ["Communications", "Deployments", "English", "Excel", "Git"],
+    'cooccurrence_tab': ["P(B | A)", "Lift", "Count"],
+}
+
+
+def share_runtime():
+    # around each run AppTest installs a mock runtime, compiles the script
+    # and overrides a config option, and undoes all of it when the run ends,
+    # which breaks the runs still going in other threads. instead all
+    # sessions share one runtime, one compiled script and one override, as
+    # sessions of a server process do, and AppTest gets stand-ins for them
+    app_test = importlib.import_module('streamlit.testing.v1.app_test')
+    runtime = MagicMock(spec=app_test.Runtime)
+    runtime.media_file_mgr = app_test.MediaFileManager(app_test.MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = app_test.DataframeSourceManager()
+    runtime.cache_storage_manager = app_test.MemoryCacheStorageManager()
+    runtime.bidi_component_registry = app_test.BidiComponentManager()
+    runtime.bidi_component_registry.discover_and_register_components(start_file_watching=False)
+    app_test.Runtime._instance = runtime
+    app_test.Runtime = type('Runtime', (), {'_instance': None})
+    script_cache = app_test.ScriptCache()
+    for module in (app_test, importlib.import_module('streamlit.testing.v1.local_script_runner')):
+        module.ScriptCache = lambda: script_cache
+    global _config_override
+    _config_override = app_test.patch_config_options({"global.appTest": True})
+    _config_override.__enter__()
+    app_test.patch_config_options = lambda overrides: contextlib.nullcontext()
+
+
+def random_change(app, rng):
+    # what a visitor does between two reruns: mostly edits their skills,
+    # sometimes opens another tab or filters by city
+    action = rng.choice(['core_skills', 'soft_skills', 'tab', 'city'], p=[0.4, 0.3, 0.2, 0.1])
+    if action == 'core_skills':
+        app.multiselect(key='core_skills').set_value([str(skill) for skill in rng.choice(CORE_SKILLS, rng.integers(1, 6), replace=False)])
+    elif action == 'soft_skills':
+        app.multiselect(key='soft_skills').set_value([str(skill) for skill in rng.choice(SOFT_SKILLS, rng.integers(0, 4), replace=False)])
+    elif action == 'tab':
+        key = str(rng.choice(list(TABS)))
+        # what clicking a tab sends: its label as the tabs' widget value
+        app.session_state[key] = str(rng.choice(TABS[key]))
+    else:
+        city = app.sidebar.multiselect(key='facet_city')
+        city.set_value([] if city.value else [str(rng.choice(city.options[:5]))])
+
+
+def session(number, reruns, latencies, errors):
+    AppTest = importlib.import_module('streamlit.testing.v1').AppTest
+    rng = np.random.default_rng(number)
+    app = AppTest.from_file(SCRIPT_PATH, default_timeout=RERUN_TIMEOUT)
+    for rerun in range(reruns + 1):
+        try:
+            if rerun:
+                random_change(app, rng)
+            start = time.perf_counter()
+            app.run()
+        except Exception as error:
+            errors.append(f"session {number}: {error!r}")
+            return
+        latencies.append(time.perf_counter() - start)
+        errors.extend(f"session {number}: {exception.value}" for exception in app.exception)
+
+
+def load_test(sessions, reruns):
+    # every session runs the whole script in its own thread of this process,
+    # sharing caches and the GIL like sessions of one streamlit server do
+    share_runtime()
+
+    # one session renders the page first, so the concurrent sessions measure
+    # a warmed up process: imports done, script compiled, caches filled.
+    # that also keeps their first reruns from compiling the script while
+    # another thread compiles templates, which python 3.11's ast.parse
+    # isn't safe against
+    warm_up, errors = [], []
+    session(sessions, 0, warm_up, errors)
+
+    latencies = []
+    threads = [threading.Thread(target=session, args=(number, reruns, latencies, errors)) for number in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array(latencies)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (None, None, None)
+    return {
+        'sessions': sessions,
+        'reruns_per_session': reruns,
+        'reruns': len(latencies),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed,
+        'p50': p50,
+        'p95': p95,
+        'p99': p99,
+        'warm_up_seconds': warm_up[0] if warm_up else None,
+        # linux reports ru_maxrss in kilobytes
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'errors': errors,
+    }
+
+
+if __name__ == '__main__':
+    # python loadtest.py <sessions> <reruns per session> [results.json] [--max-p95=<seconds>]
+    # exits with 1 when a rerun failed or p95 is above the limit, so a deploy
+    # can be gated on it
+    arguments = [argument for argument in sys.argv[1:] if not argument.startswith('--max-p95=')]
+    limits = [float(argument.split('=', 1)[1]) for argument in sys.argv[1:] if argument.startswith('--max-p95=')]
+    if len(arguments) < 2:
+        sys.exit("usage: python loadtest.py <sessions> <reruns per session> [results.json] [--max-p95=<seconds>]")
+
+    results = load_test(int(arguments[0]), int(arguments[1]))
+    report = json.dumps({key: float(value) if isinstance(value, np.floating) else value for key, value in results.items()}, indent=2)
+    if len(arguments) > 2:
+        with open(arguments[2], 'w') as file:
+            file.write(report)
+    print(report)
+
+    if results['errors'] or (limits and (results['p95'] is None or results['p95'] > limits[0])):
+        sys.exit(1)
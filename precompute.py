@@ -0,0 +1,259 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from aggregates import AGGREGATES_PATH, build_features, load_aggregates, save_aggregates, stream_aggregates
+from dataset import CSV_PATH, SNAPSHOT_PATH, dataset_version, iter_postings, load_arrays, read_postings, save_arrays, snapshot_stamp, snapshot_version
+from dedup import cluster_arrays
+from facets import build_facet_index
+from geo import DETAIL_ZOOM, cluster_points, located
+from regions import REGIONS_PATH, assign_regions, assignment_version, load_regions
+from search import search_index_arrays
+from skill_index import SKILL_COLUMNS
+
+
+# one directory per dataset version, never changed once written, and a
+# pointer file naming the latest one
+PRECOMPUTED_PATH = './input_3.precomputed'
+LATEST = 'LATEST'
+# older snapshots kept besides the latest, for sessions still reading them
+KEEP_SNAPSHOTS = 1
+# seconds between checks for new postings in --watch mode
+WATCH_INTERVAL = 30
+# processes computing the tasks. each holds its own copy of the postings, so
+# set PRECOMPUTE_WORKERS from the memory the dyno has, not its cores
+WORKERS = int(os.environ.get('PRECOMPUTE_WORKERS', 2))
+
+POSTINGS = 'postings.arrow'
+AGGREGATES = 'aggregates.json'
+FEATURES = 'features.npz'
+FACETS = 'facets.npz'
+MAP = 'map.npz'
+CLUSTERS = 'clusters.npz'
+SEARCH = 'search.npz'
+REGIONS = 'regions.npz'
+REGIONS_GEOJSON = 'regions.geojson'
+MANIFEST = 'manifest.json'
+
+
+# every task reads the snapshot's own copy of the postings and writes one file
+# of it, they run in separate processes
+
+def compute_aggregates_file(directory, version):
+    # ingest.py merges every batch into the aggregates of the postings before
+    # it, they are only counted again when those are missing or stale
+    aggregates = load_aggregates(version, AGGREGATES_PATH)
+    if aggregates is None:
+        aggregates = stream_aggregates(iter_postings(os.path.join(directory, POSTINGS)))
+    save_aggregates(aggregates, version, os.path.join(directory, AGGREGATES))
+
+
+def compute_features_file(directory, version):
+    features = build_features(read_postings(os.path.join(directory, POSTINGS), ['work_type', 'applicant_count'] + SKILL_COLUMNS))
+    codes, work_types = features['work_type']
+    save_arrays({
+        'patterns': features['patterns'],
+        'pattern_ids': features['pattern_ids'],
+        'work_type_codes': codes,
+        'work_types': np.array(work_types, dtype=str),
+        'applicants': features['applicants'],
+    }, version, os.path.join(directory, FEATURES))
+
+
+def compute_facets_file(directory, version):
+    index = build_facet_index(read_postings(os.path.join(directory, POSTINGS), ['location', 'posted_on', 'scraped_at', 'work_type', 'company']))
+    arrays = {'rows': np.array(index['rows'])}
+    for facet, values in index['facets'].items():
+        arrays[f"{facet}.values"] = np.array(values['values'], dtype=str)
+        arrays[f"{facet}.positions"] = values['positions']
+        arrays[f"{facet}.offsets"] = values['offsets']
+    save_arrays(arrays, version, os.path.join(directory, FACETS))
+
+
+def compute_map_file(directory, version):
+    # the unfiltered clusters of every zoom level that shows clusters
+    points = located(read_postings(os.path.join(directory, POSTINGS), ['id', 'lat', 'lng']))
+    arrays = {}
+    for zoom in range(DETAIL_ZOOM):
+        clusters = cluster_points(points['lat'], points['lng'], zoom)
+        for column in clusters.columns:
+            arrays[f"{zoom}.{column}"] = clusters[column].to_numpy()
+    save_arrays(arrays, version, os.path.join(directory, MAP))
+
+
+def compute_clusters_file(directory, version):
+    save_arrays(cluster_arrays(os.path.join(directory, POSTINGS)), version, os.path.join(directory, CLUSTERS))
+
+
+def compute_search_file(directory, version):
+    save_arrays(search_index_arrays(os.path.join(directory, POSTINGS)), version, os.path.join(directory, SEARCH))
+
+
+def compute_regions_file(directory, version):
+    # only when a regions file is bundled, it is copied along so the codes
+    # and the polygons they index always come from the same file
+    if not os.path.exists(REGIONS_PATH):
+        return
+    geojson_path = os.path.join(directory, REGIONS_GEOJSON)
+    shutil.copyfile(REGIONS_PATH, geojson_path)
+    postings = read_postings(os.path.join(directory, POSTINGS), ['lat', 'lng'])
+    codes = assign_regions(postings['lat'], postings['lng'], load_regions(geojson_path))
+    save_arrays({'codes': codes}, assignment_version(version, geojson_path), os.path.join(directory, REGIONS))
+
+
+TASKS = {
+    'aggregates': compute_aggregates_file,
+    'features': compute_features_file,
+    'facets': compute_facets_file,
+    'map': compute_map_file,
+    'clusters': compute_clusters_file,
+    'search': compute_search_file,
+    'regions': compute_regions_file,
+}
+
+
+def _timed(task, directory, version):
+    start = time.perf_counter()
+    TASKS[task](directory, version)
+    return time.perf_counter() - start
+
+
+def latest_version(path=PRECOMPUTED_PATH):
+    # version of the latest complete snapshot, None before the first one
+    try:
+        with open(os.path.join(path, LATEST)) as file:
+            version = file.read().strip()
+    except FileNotFoundError:
+        return None
+    return version if os.path.isdir(os.path.join(path, version)) else None
+
+
+def _publish(version, path):
+    # the pointer is replaced in one rename, readers see the old or the new
+    # version, never a partly written one
+    tmp_path = os.path.join(path, LATEST + '.tmp')
+    with open(tmp_path, 'w') as file:
+        file.write(version)
+    os.replace(tmp_path, os.path.join(path, LATEST))
+
+
+def _prune(path, keep=KEEP_SNAPSHOTS):
+    latest = latest_version(path)
+    snapshots = sorted(
+        (entry for entry in os.scandir(path) if entry.is_dir() and not entry.name.startswith('.') and entry.name != latest),
+        key=lambda entry: entry.stat().st_mtime, reverse=True,
+    )
+    for entry in snapshots[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def precompute(csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH, path=PRECOMPUTED_PATH, workers=WORKERS):
+    # copies the current postings into a new snapshot directory, computes
+    # every task on them in a process pool and publishes the directory once
+    # all of them are written. returns the snapshot's version
+    dataset_version(csv_path, snapshot_path)
+    os.makedirs(path, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix='.tmp-', dir=path)
+    os.chmod(directory, 0o755)
+    try:
+        # ingest.py replaces the snapshot in one rename, so the copy is one
+        # whole version of it, hashed again to know which
+        shutil.copyfile(snapshot_path, os.path.join(directory, POSTINGS))
+        version = snapshot_version(os.path.join(directory, POSTINGS))
+        if os.path.isdir(os.path.join(path, version)):
+            shutil.rmtree(directory)
+            _publish(version, path)
+            return version
+
+        with ProcessPoolExecutor(workers) as pool:
+            futures = {task: pool.submit(_timed, task, directory, version) for task in TASKS}
+            seconds = {task: future.result() for task, future in futures.items()}
+        with open(os.path.join(directory, MANIFEST), 'w') as file:
+            json.dump({'version': version, 'created_at': time.time(), 'seconds': seconds}, file)
+        os.rename(directory, os.path.join(path, version))
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    _publish(version, path)
+    _prune(path)
+    return version
+
+
+def load_precomputed(version, path=PRECOMPUTED_PATH):
+    # everything of one snapshot the app reads, loaded at once so a session
+    # never mixes two versions
+    directory = os.path.join(path, version)
+    with open(os.path.join(directory, MANIFEST)) as file:
+        manifest = json.load(file)
+
+    features = load_arrays(version, os.path.join(directory, FEATURES))
+    facets = load_arrays(version, os.path.join(directory, FACETS))
+    facet_names = sorted({name.split('.')[0] for name in facets if name != 'rows'})
+    facet_index = {'rows': int(facets['rows']), 'facets': {}}
+    for facet in facet_names:
+        values = facets[f"{facet}.values"].tolist()
+        facet_index['facets'][facet] = {
+            'values': values,
+            'codes': {value: code for code, value in enumerate(values)},
+            'positions': facets[f"{facet}.positions"],
+            'offsets': facets[f"{facet}.offsets"],
+        }
+
+    clusters_map = load_arrays(version, os.path.join(directory, MAP))
+    zooms = sorted({int(name.split('.')[0]) for name in clusters_map})
+
+    regions = None
+    geojson_path = os.path.join(directory, REGIONS_GEOJSON)
+    if os.path.exists(geojson_path):
+        regions = {
+            'codes': load_arrays(assignment_version(version, geojson_path), os.path.join(directory, REGIONS))['codes'],
+            'geojson': load_regions(geojson_path),
+        }
+
+    return {
+        'version': version,
+        'seconds': manifest['seconds'],
+        'postings': os.path.join(directory, POSTINGS),
+        'aggregates': load_aggregates(version, os.path.join(directory, AGGREGATES)),
+        'features': {
+            'rows': len(features['pattern_ids']),
+            'patterns': features['patterns'],
+            'pattern_ids': features['pattern_ids'],
+            'work_type': (features['work_type_codes'], features['work_types'].tolist()),
+            'applicants': features['applicants'],
+        },
+        'facet_index': facet_index,
+        'map': {zoom: {column: clusters_map[f"{zoom}.{column}"] for column in ('lat', 'lng', 'count')} for zoom in zooms},
+        'clusters': load_arrays(version, os.path.join(directory, CLUSTERS))['clusters'],
+        'search': load_arrays(version, os.path.join(directory, SEARCH)),
+        'regions': regions,
+    }
+
+
+def watch(interval=WATCH_INTERVAL, csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH, path=PRECOMPUTED_PATH):
+    # precomputes again whenever the postings change
+    stamp = None
+    while True:
+        current = snapshot_stamp(csv_path, snapshot_path)
+        if current != stamp:
+            start = time.perf_counter()
+            version = precompute(csv_path, snapshot_path, path)
+            print(f"precomputed {version} in {time.perf_counter() - start:.1f}s", flush=True)
+            stamp = current
+        time.sleep(interval)
+
+
+if __name__ == '__main__':
+    # python precompute.py [--watch]: writes the snapshot of the current
+    # postings, with --watch keeps writing one whenever they change
+    if '--watch' in sys.argv:
+        watch()
+    version = precompute()
+    print(f"precomputed {version}: {load_precomputed(version)['seconds']}")
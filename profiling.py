@@ -0,0 +1,152 @@
+import importlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+
+# set STARTUP_PROFILE=1 (or open the app with ?profile=1) to show the profile
+PROFILE_ENABLED = os.environ.get('STARTUP_PROFILE') == '1'
+# every section render is also appended here as a json line when set
+METRICS_PATH = os.environ.get('METRICS_PATH')
+# renders per section the p50/p95 are computed over
+METRICS_WINDOW = 200
+
+logger = logging.getLogger(__name__)
+
+_process_start = time.perf_counter()
+_lock = threading.Lock()
+_imports = {}
+_first_renders = {}
+_renders = {}
+# the section being rendered and the cached call running in this thread,
+# streamlit runs every session's script in its own thread
+_local = threading.local()
+
+
+def lazy_import(name):
+    # imports `name` the first time a section needs it and records how long
+    # that took. later calls still go through import_module, which waits
+    # while another session's thread is half way through the same import
+    # instead of handing out the partially initialized module
+    loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not loaded:
+        with _lock:
+            _imports.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+@contextmanager
+def section(name):
+    # times every render of a dashboard section, together with the rows,
+    # payload bytes and cache hits and misses noted while it ran. the first
+    # render in the process also goes into the startup profile
+    render = {'rows': 0, 'payload_bytes': 0, 'cache_hits': 0, 'cache_misses': 0}
+    outer, _local.render = getattr(_local, 'render', None), render
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        _local.render = outer
+        with _lock:
+            _first_renders.setdefault(name, (end - start, end - _process_start))
+        _record(name, end - start, render)
+
+
+def note(**counts):
+    # adds to the counts of the section rendering in this thread, if any
+    render = getattr(_local, 'render', None)
+    if render is not None:
+        for key, value in counts.items():
+            render[key] += int(value)
+
+
+def counted_cache(cache):
+    # applies a streamlit cache decorator (st.cache_data(...) and the like)
+    # and notes a hit or a miss for every call, a miss being a call that ran
+    # the function body
+    def decorator(func):
+        @wraps(func)
+        def body(*args, **kwargs):
+            _local.missed = True
+            return func(*args, **kwargs)
+        cached = cache(body)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            outer, _local.missed = getattr(_local, 'missed', False), False
+            try:
+                return cached(*args, **kwargs)
+            finally:
+                note(**{'cache_misses' if _local.missed else 'cache_hits': 1})
+                _local.missed = outer
+        wrapper.clear = cached.clear
+        return wrapper
+    return decorator
+
+
+def _cache_outcome(render):
+    if render['cache_misses']:
+        return 'miss' if not render['cache_hits'] else 'mixed'
+    return 'hit' if render['cache_hits'] else None
+
+
+def _record(name, seconds, render):
+    record = dict(section=name, seconds=round(seconds, 6), time=time.time(), cache=_cache_outcome(render), **render)
+    with _lock:
+        _renders.setdefault(name, deque(maxlen=METRICS_WINDOW)).append(record)
+        if METRICS_PATH:
+            with open(METRICS_PATH, 'a') as file:
+                file.write(json.dumps(record) + '\n')
+    logger.info(json.dumps(record))
+
+
+def section_metrics():
+    # per section over the last METRICS_WINDOW renders
+    with _lock:
+        renders = {name: list(window) for name, window in _renders.items()}
+
+    metrics = {}
+    for name, window in renders.items():
+        seconds = [render['seconds'] for render in window]
+        lookups = sum(render['cache_hits'] + render['cache_misses'] for render in window)
+        metrics[name] = {
+            'renders': len(window),
+            'p50': _percentile(seconds, 50),
+            'p95': _percentile(seconds, 95),
+            # most rows one render had to scan, renders served from cache scan none
+            'rows': max(render['rows'] for render in window),
+            'payload_bytes': window[-1]['payload_bytes'],
+            'hit_rate': sum(render['cache_hits'] for render in window) / lookups if lookups else None,
+        }
+    return metrics
+
+
+def _percentile(values, percent):
+    # nearest rank, enough for a window of a few hundred renders
+    values = sorted(values)
+    return values[max(0, -(-len(values) * percent // 100) - 1)]
+
+
+def startup_profile():
+    with _lock:
+        return {
+            'imports': dict(_imports),
+            'sections': {name: {'seconds': seconds, 'finished_at': finished_at} for name, (seconds, finished_at) in _first_renders.items()},
+        }
+
+
+def reset_sections():
+    # forgets every section render, so the next one of each counts as first
+    # again. imports stay, they only happen once per process
+    with _lock:
+        _first_renders.clear()
+        _renders.clear()
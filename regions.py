@@ -0,0 +1,225 @@
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from aggregates import skill_flags
+from dataset import CSV_PATH, SNAPSHOT_PATH, current_arrays, dataset_version, load_postings
+from skill_index import SKILL_COLUMNS
+
+
+# province polygons of indonesia, bundled with the app. converted by python
+# regions.py --convert <Indonesia.js> from the map of echarts-countries-pypkg
+# 0.1.6 on pypi (MIT)
+REGIONS_PATH = './regions.geojson'
+ASSIGNMENT_PATH = './input_3.regions.npz'
+# echarts stores coordinates as utf-8 encoded deltas in 1/1024 degrees
+ECHARTS_SCALE = 1024
+# decimals kept of every coordinate, about 100 m, plenty for a choropleth
+COORDINATE_DECIMALS = 3
+
+# latitude band height of the edge index. a point is only tested against the
+# polygon edges that cross its band
+BAND_DEGREES = 0.1
+# (point, edge) pairs tested at once, to bound memory
+PAIR_BATCH = 4_000_000
+# region code of postings outside every polygon or without coordinates
+OUTSIDE = -1
+
+
+def _rounded_ring(ring):
+    points = np.round(np.asarray(ring, dtype=np.float64), COORDINATE_DECIMALS)
+    keep = np.concatenate([[True], (np.diff(points, axis=0) != 0).any(axis=1)])
+    return points[keep].tolist()
+
+
+def _decoded_ring(encoded, offset):
+    # every character pair is a zigzag encoded step from the previous point
+    steps = np.array([ord(char) - 64 for char in encoded], dtype=np.int64).reshape(-1, 2)
+    steps = (steps >> 1) ^ -(steps & 1)
+    return np.cumsum(steps, axis=0) + offset
+
+
+def convert_regions(source_path, path=REGIONS_PATH):
+    # decodes an echarts map script into geojson, keeping only the region
+    # names, with rounded coordinates
+    with open(source_path, encoding='utf-8') as file:
+        script = file.read()
+    start = script.index('{', script.index('registerMap('))
+    layer, _ = json.JSONDecoder().raw_decode(script, start)
+
+    features = []
+    for feature in layer['features']:
+        geometry = feature['geometry']
+        polygons, offsets = geometry['coordinates'], geometry['encodeOffsets']
+        if geometry['type'] == 'Polygon':
+            polygons, offsets = [polygons], [offsets]
+        features.append({
+            'type': 'Feature',
+            'properties': {'name': feature['properties']['name']},
+            'geometry': {'type': 'MultiPolygon', 'coordinates': [
+                [_rounded_ring(_decoded_ring(ring, offset) / ECHARTS_SCALE) for ring, offset in zip(polygon, polygon_offsets)]
+                for polygon, polygon_offsets in zip(polygons, offsets)
+            ]},
+        })
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump({'type': 'FeatureCollection', 'features': features}, file, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return path
+
+
+def regions_stamp(path=REGIONS_PATH):
+    with open(path, 'rb') as file:
+        return hashlib.blake2b(file.read(), digest_size=8).hexdigest()
+
+
+def load_regions(path=REGIONS_PATH):
+    with open(path) as file:
+        return json.load(file)
+
+
+def polygon_edges(regions):
+    # every ring edge of every region as (x1, y1, x2, y2) rows plus the
+    # region it bounds. holes are rings like any other, the even-odd rule
+    # below leaves them out
+    edges, owners = [], []
+    for region, feature in enumerate(regions['features']):
+        geometry = feature['geometry']
+        polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+        for ring in (ring for polygon in polygons for ring in polygon):
+            ring = np.asarray(ring, dtype=np.float64)[:, :2]
+            if len(ring) < 3:
+                continue
+            closed = np.vstack([ring, ring[:1]]) if (ring[0] != ring[-1]).any() else ring
+            edges.append(np.hstack([closed[:-1], closed[1:]]))
+            owners.append(np.full(len(closed) - 1, region, dtype=np.int32))
+    if not edges:
+        return np.zeros((0, 4)), np.zeros(0, dtype=np.int32)
+    edges, owners = np.concatenate(edges), np.concatenate(owners)
+    # horizontal edges never cross a horizontal ray
+    crossing = edges[:, 1] != edges[:, 3]
+    return edges[crossing], owners[crossing]
+
+
+def build_edge_index(edges, band=BAND_DEGREES):
+    # edges of latitude band i are edge_ids[offsets[i]:offsets[i + 1]], an
+    # edge is listed in every band its latitude range touches
+    if not len(edges):
+        return {'band': band, 'first': 0, 'edge_ids': np.zeros(0, dtype=np.int64), 'offsets': np.zeros(1, dtype=np.int64)}
+    bottom = np.floor(edges[:, [1, 3]].min(axis=1) / band).astype(np.int64)
+    top = np.floor(edges[:, [1, 3]].max(axis=1) / band).astype(np.int64)
+    first = int(bottom.min())
+    spans = top - bottom + 1
+
+    edge_ids = np.repeat(np.arange(len(edges)), spans)
+    bands = np.repeat(bottom - first, spans) + np.arange(len(edge_ids)) - np.repeat(np.cumsum(spans) - spans, spans)
+    order = np.argsort(bands, kind='stable')
+    counts = np.bincount(bands, minlength=int(top.max()) - first + 1)
+    return {'band': band, 'first': first, 'edge_ids': edge_ids[order], 'offsets': np.concatenate([[0], np.cumsum(counts)])}
+
+
+def assign_points(lat, lng, edges, owners, n_regions, index):
+    # region of every point by ray casting: a point lies in a region when a
+    # ray from it towards +lng crosses the region's edges an odd number of
+    # times. only the edges in the point's latitude band are tested, all
+    # pairs of a batch in one array pass. OUTSIDE when no region has it
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    codes = np.full(len(lat), OUTSIDE, dtype=np.int32)
+    located = np.flatnonzero(~(np.isnan(lat) | np.isnan(lng)))
+    if not len(located) or not len(edges):
+        return codes
+
+    bands = np.floor(lat[located] / index['band']).astype(np.int64) - index['first']
+    in_range = (bands >= 0) & (bands < len(index['offsets']) - 1)
+    located, bands = located[in_range], bands[in_range]
+    starts, ends = index['offsets'][bands], index['offsets'][bands + 1]
+    pair_counts = ends - starts
+
+    cumulative = np.cumsum(pair_counts)
+    start = 0
+    while start < len(located):
+        # as many points as fit in a batch of pairs, at least one
+        done = cumulative[start - 1] if start else 0
+        stop = max(int(np.searchsorted(cumulative, done + PAIR_BATCH, side='right')), start + 1)
+        points, counts = located[start:stop], pair_counts[start:stop]
+        batch_starts = starts[start:stop]
+        start = stop
+        if not counts.sum():
+            continue
+
+        point = np.repeat(np.arange(len(counts)), counts)
+        edge = index['edge_ids'][np.repeat(batch_starts, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)]
+        x1, y1, x2, y2 = edges[edge].T
+        y, x = lat[points][point], lng[points][point]
+        crosses = ((y1 > y) != (y2 > y)) & (x < x1 + (y - y1) * (x2 - x1) / (y2 - y1))
+
+        parity = np.bincount(point[crosses] * n_regions + owners[edge[crosses]], minlength=len(counts) * n_regions).reshape(len(counts), n_regions) % 2
+        inside = parity.any(axis=1)
+        # overlapping polygons go to the first region listed
+        codes[points[inside]] = parity[inside].argmax(axis=1)
+    return codes
+
+
+def assign_regions(lat, lng, regions):
+    # distinct coordinates are assigned once, postings geocoded to the same
+    # city share them
+    edges, owners = polygon_edges(regions)
+    index = build_edge_index(edges)
+    coordinates = np.column_stack([np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64)])
+    unique, inverse = np.unique(coordinates, axis=0, return_inverse=True)
+    codes = assign_points(unique[:, 0], unique[:, 1], edges, owners, len(regions['features']), index)
+    return codes[inverse.ravel()]
+
+
+def region_names(regions):
+    return [feature['properties']['name'] for feature in regions['features']]
+
+
+def region_counts(codes, names, pattern_ids=None, patterns=None, selection=None, skills=SKILL_COLUMNS):
+    # postings per region and, given the features' skill patterns, postings
+    # per region mentioning each skill: one 2d bincount over (region, pattern)
+    # and one matrix product with the patterns' skill flags
+    if selection is not None:
+        codes = codes[selection]
+        pattern_ids = pattern_ids[selection] if pattern_ids is not None else None
+    inside = codes != OUTSIDE
+    frame = pd.DataFrame({'postings': np.bincount(codes[inside], minlength=len(names))}, index=pd.Index(names, name='region'))
+    if pattern_ids is not None:
+        pairs = np.bincount(codes[inside].astype(np.int64) * len(patterns) + pattern_ids[inside], minlength=len(names) * len(patterns))
+        frame[skills] = pairs.reshape(len(names), len(patterns)) @ skill_flags(patterns, skills).astype(np.int64)
+    frame.attrs['outside'] = int((~inside).sum())
+    return frame
+
+
+def assignment_version(version, regions_path=REGIONS_PATH):
+    # stored codes are only valid for the dataset and regions they describe
+    return f"{version}:{regions_stamp(regions_path)}"
+
+
+def assignment_arrays(regions_path=REGIONS_PATH, csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    postings = load_postings(['lat', 'lng'], csv_path, snapshot_path)
+    return {'codes': assign_regions(postings['lat'], postings['lng'], load_regions(regions_path))}
+
+
+def current_assignment(version, regions_path=REGIONS_PATH, path=ASSIGNMENT_PATH, csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    # region code per posting, None without a regions file
+    if not os.path.exists(regions_path):
+        return None
+    return current_arrays(assignment_version(version, regions_path), path, lambda: assignment_arrays(regions_path, csv_path, snapshot_path))['codes']
+
+
+if __name__ == '__main__':
+    # python regions.py [--convert <Indonesia.js>]: writes the regions file
+    # from an echarts map first when asked, then assigns the postings
+    if '--convert' in sys.argv:
+        convert_regions(sys.argv[sys.argv.index('--convert') + 1])
+    codes = current_assignment(dataset_version())
+    counts = region_counts(codes, region_names(load_regions()))
+    print(counts['postings'].sort_values(ascending=False).head(10).to_string())
+    print(f"{counts.attrs['outside']} postings outside every region")
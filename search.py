@@ -0,0 +1,123 @@
+import re
+import sys
+import unicodedata
+
+import numpy as np
+
+from dataset import SNAPSHOT_PATH, current_arrays, dataset_version, iter_postings
+
+
+SEARCH_INDEX_PATH = './input_3.search.npz'
+
+# descriptions mix indonesian and english, so both languages' most common
+# function words are left out of the index
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in', 'is', 'it',
+    'of', 'on', 'or', 'our', 'that', 'the', 'this', 'to', 'we', 'will', 'with', 'you', 'your',
+    'adalah', 'akan', 'anda', 'atau', 'dalam', 'dan', 'dapat', 'dari', 'dengan', 'di', 'ini', 'itu',
+    'juga', 'kami', 'ke', 'oleh', 'pada', 'para', 'serta', 'untuk', 'yang',
+}
+# words joined by / . + # & or - ("a/b", "d3.js", "power-bi") stay one token
+_TOKEN = re.compile(r"[a-z0-9]+(?:[/.+#&-][a-z0-9]+)*")
+_PARTS = re.compile(r"[/.+#&-]")
+# longer tokens are urls and the like, nobody searches for them
+MAX_TOKEN_LENGTH = 32
+
+# bm25 term frequency saturation and document length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text, parts=True):
+    # lowercased ascii tokens. with `parts` a joined token is also indexed as
+    # its pieces, so "python/sql" is found by "python" as well as "python/sql"
+    if not isinstance(text, str):
+        return []
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode().lower()
+
+    tokens = []
+    for token in _TOKEN.findall(text):
+        tokens.append(token)
+        if parts and _PARTS.search(token):
+            tokens.extend(_PARTS.split(token))
+    return [token for token in tokens if token not in STOPWORDS and len(token) <= MAX_TOKEN_LENGTH]
+
+
+def build_search_index(chunks):
+    # inverted index over a stream of description chunks: the postings of
+    # terms[i] are doc_ids[offsets[i]:offsets[i + 1]] with their term
+    # frequencies, terms sorted so lookups are a binary search
+    vocabulary = {}
+    doc_parts, term_parts, frequency_parts, lengths = [], [], [], []
+    row = 0
+    for descriptions in chunks:
+        docs, terms = [], []
+        for text in descriptions:
+            term_ids = [vocabulary.setdefault(token, len(vocabulary)) for token in tokenize(text)]
+            lengths.append(len(term_ids))
+            terms.extend(term_ids)
+            docs.extend([row] * len(term_ids))
+            row += 1
+
+        # repeated (posting, term) pairs collapse into a term frequency
+        pairs, frequencies = np.unique(np.array(docs, dtype=np.int64) << 32 | np.array(terms, dtype=np.int64), return_counts=True)
+        doc_parts.append((pairs >> 32).astype(np.int32))
+        term_parts.append((pairs & 0xFFFFFFFF).astype(np.int64))
+        frequency_parts.append(frequencies.astype(np.int32))
+
+    words = np.array(list(vocabulary), dtype=f'S{MAX_TOKEN_LENGTH}')
+    order = np.argsort(words)
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+
+    term_ids = rank[np.concatenate(term_parts)] if term_parts else np.zeros(0, dtype=np.int64)
+    # stable, so every term's postings stay in posting order
+    by_term = np.argsort(term_ids, kind='stable')
+    return {
+        'terms': words[order],
+        'offsets': np.concatenate([[0], np.cumsum(np.bincount(term_ids, minlength=len(words)))]),
+        'doc_ids': np.concatenate(doc_parts)[by_term] if doc_parts else np.zeros(0, dtype=np.int32),
+        'term_frequencies': np.concatenate(frequency_parts)[by_term] if frequency_parts else np.zeros(0, dtype=np.int32),
+        'doc_lengths': np.array(lengths, dtype=np.int32),
+    }
+
+
+def bm25_scores(index, query, k1=BM25_K1, b=BM25_B):
+    # one bm25 score per posting, 0 for postings without any query term. only
+    # the postings of the query's terms are touched
+    lengths = index['doc_lengths']
+    scores = np.zeros(len(lengths))
+    if not len(lengths):
+        return scores
+    length_norm = k1 * (1 - b + b * lengths / max(lengths.mean(), 1))
+
+    for term in set(tokenize(query, parts=False)):
+        term = term.encode()
+        i = np.searchsorted(index['terms'], term)
+        if i == len(index['terms']) or index['terms'][i] != term:
+            continue
+        start, end = index['offsets'][i], index['offsets'][i + 1]
+        docs, frequencies = index['doc_ids'][start:end], index['term_frequencies'][start:end]
+
+        idf = np.log(1 + (len(lengths) - len(docs) + 0.5) / (len(docs) + 0.5))
+        scores[docs] += idf * frequencies * (k1 + 1) / (frequencies + length_norm[docs])
+    return scores
+
+
+def search_index_arrays(snapshot_path=SNAPSHOT_PATH):
+    return build_search_index(chunk['description'] for chunk in iter_postings(snapshot_path, columns=['description']))
+
+
+def current_search_index(version, path=SEARCH_INDEX_PATH, snapshot_path=SNAPSHOT_PATH):
+    return current_arrays(version, path, lambda: search_index_arrays(snapshot_path))
+
+
+if __name__ == '__main__':
+    # builds the index ahead of the first search: python search.py ["query"]
+    index = current_search_index(dataset_version())
+    print(f"indexed {len(index['doc_lengths'])} postings, {len(index['terms'])} terms")
+    if len(sys.argv) > 1:
+        scores = bm25_scores(index, sys.argv[1])
+        for row in np.argsort(-scores)[:10]:
+            if scores[row] > 0:
+                print(row, round(scores[row], 3))
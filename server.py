@@ -1,431 +1,428 @@
+import io
+
+import numpy as np
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
-import folium 
-from folium.plugins import MarkerCluster
-from streamlit_folium import st_folium
-from venn import venn
+
+from aggregates import SKILL_GROUPS, VENN_DIAGRAMS, aggregate_features, build_features, cooccurrence_stats, current_aggregates, freeze_aggregates, signature_table
+from binning import NUMERIC_FIELDS, PERCENTILES, bin_codes, bin_counts, bin_labels, numeric_values, percentiles, uniform_edges
+from dataset import dataset_version, freeze, load_postings, read_postings, snapshot_stamp
+from dedup import current_clusters, one_per_cluster
+from facets import FACET_LABELS, build_facet_index, normalize_filters, select
+from figure_cache import cache_stats, cached_figure
+from precompute import latest_version, load_precomputed
+from geo import MAP_CENTER, MAP_ZOOM, DETAIL_ZOOM, located, cluster_points, within_bounds
+from regions import current_assignment, load_regions as read_regions, region_counts, region_names
+from search import bm25_scores, current_search_index
+from timeline import RESOLUTIONS, ensure_timeline, periods, trend
+from profiling import PROFILE_ENABLED, METRICS_WINDOW, counted_cache, lazy_import, note, section, section_metrics, startup_profile
+from skill_index import SKILL_COLUMNS, CORE_SKILLS, SOFT_SKILLS, MATCH_SKILLS, skill_mask, skill_names, signature_matches, best_missing_skill, match_scores, top_k
 
 st.set_page_config(layout="wide")
-st.set_option('deprecation.showPyplotGlobalUse', False)
 
-@st.cache
-def load_dataframe():
-    data_analyst = pd.read_csv('./input_3.csv')
+# everything precompute.py wrote for the latest postings, loaded once per
+# version. the pointer is read once per rerun, so a new snapshot swaps in
+# between reruns and a rerun never mixes two versions. without one every
+# loader below computes its part on the first request
+@st.cache_resource(max_entries=2)
+def load_snapshot(version):
+    return load_precomputed(version)
+
+precomputed_version = latest_version()
+snapshot = load_snapshot(precomputed_version) if precomputed_version is not None else None
+
+def data_stamp():
+    return snapshot['version'] if snapshot is not None else snapshot_stamp()
+
+# held once per process and handed to every session as is: no hashing, no
+# copies, and read-only buffers so chart code can't mutate the shared data
+# the snapshot stamp is part of the key, so postings appended by ingest.py
+# show up on the next rerun without restarting the app
+@st.cache_resource(max_entries=2)
+def load_dataframe(stamp):
+    data_analyst = freeze(read_postings(snapshot['postings']) if snapshot is not None else load_postings())
     return data_analyst 
-data_analyst = load_dataframe()
+data_analyst = load_dataframe(data_stamp())
+
+@st.cache_resource(max_entries=2)
+def _dataset_version(stamp):
+    return dataset_version()
+
+def load_dataset_version():
+    if snapshot is not None:
+        return snapshot['version']
+    return _dataset_version(snapshot_stamp())
+
+# facet value -> postings, built with the dataframe so every filter change
+# only has to look up the selected values
+@st.cache_resource(max_entries=2)
+def load_facet_index(stamp):
+    return snapshot['facet_index'] if snapshot is not None else build_facet_index(data_analyst)
+
+@st.cache_resource(max_entries=2)
+def load_features(stamp):
+    return snapshot['features'] if snapshot is not None else build_features(data_analyst)
+
+@st.cache_resource(max_entries=2)
+def load_clusters(version):
+    return snapshot['clusters'] if snapshot is not None else current_clusters(version)
+
+# part of the filters when reposts are counted once, so every cached chart
+# keys on it like on a facet
+COUNT_CLUSTERS = ('clusters', ())
+
+def selection(filters):
+    mask = select(load_facet_index(data_stamp()), [facet for facet in filters if facet != COUNT_CLUSTERS])
+    if COUNT_CLUSTERS in filters:
+        mask = one_per_cluster(load_clusters(load_dataset_version()), mask)
+    return mask
+
+@counted_cache(st.cache_resource(max_entries=64))
+def _load_aggregates(version, filters):
+    # one copy per version and filters is shared by every session, handed
+    # out read-only
+    if not filters:
+        return freeze_aggregates(snapshot['aggregates'] if snapshot is not None else current_aggregates(version))
+    features = load_features(data_stamp())
+    note(rows=features['rows'])
+    return freeze_aggregates(aggregate_features(features, selection(filters)))
+
+def load_aggregates(filters=()):
+    # every chart counts the postings picked in the sidebar, unfiltered they
+    # come straight from the stored aggregates
+    return _load_aggregates(load_dataset_version(), filters)
+
+def filtered(data, filters):
+    mask = selection(filters)
+    return data if mask is None else data[mask]
+
+# chart figures are shared by every session in the process, per dataset version
+cached_chart = cached_figure(load_dataset_version)
 
 background = r"#0E1117"
 
-def load_map():
-    map = folium.Map(location=[-2.945311, 119.579316], zoom_start=5)
-    mCluster = MarkerCluster(name='jobs').add_to(map)
+@counted_cache(st.cache_data(max_entries=32))
+def map_clusters(version, zoom, filters):
+    if snapshot is not None and not filters and zoom in snapshot['map']:
+        return pd.DataFrame(snapshot['map'][zoom])
+    points = located(filtered(data_analyst, filters))
+    note(rows=len(points))
+    return cluster_points(points['lat'], points['lng'], zoom)
+
+def load_map(zoom, bounds, filters):
+    folium = lazy_import('folium')
+    map = folium.Map(location=MAP_CENTER, zoom_start=zoom)
+
+    if zoom >= DETAIL_ZOOM and bounds:
+        # zoomed in far enough, only the postings in view are sent
+        postings = within_bounds(located(filtered(data_analyst, filters)), bounds)
+        note(rows=len(data_analyst))
+        for id, lat, lng in zip(postings['id'], postings['lat'], postings['lng']):
+            folium.Marker([lat, lng], popup=str(id)).add_to(map)
+        return map
+
+    for lat, lng, count in map_clusters(load_dataset_version(), zoom, filters).itertuples(index=False):
+        size = 30 + 6 * len(str(count))
+        folium.Marker([lat, lng], tooltip=f"{count} jobs", icon=folium.DivIcon(
+            icon_size=(size, size),
+            icon_anchor=(size // 2, size // 2),
+            html=f"<div style='width: {size}px; height: {size}px; line-height: {size}px; border-radius: 50%; text-align: center; background: rgba(99, 110, 250, 0.7); color: white;'>{count}</div>",
+        )).add_to(map)
 
-    for id, lat, lng in zip(data_analyst['id'].dropna(), data_analyst['lat'].dropna(), data_analyst['lng'].dropna()):
-        folium.Marker([lat, lng], popup=id).add_to(mCluster)
+    return map
 
+@st.cache_resource(max_entries=2)
+def load_regions(version):
+    # province of every posting, assigned once per dataset version and
+    # regions file. None when no regions file is bundled
+    if snapshot is not None:
+        if snapshot['regions'] is None:
+            return None
+        codes, regions = snapshot['regions']['codes'], snapshot['regions']['geojson']
+    else:
+        codes = current_assignment(version)
+        if codes is None:
+            return None
+        regions = read_regions()
+    return {'codes': codes, 'names': region_names(regions), 'geojson': regions}
+
+@counted_cache(st.cache_data(max_entries=32))
+def region_table(version, filters):
+    # postings and postings per skill of every region, a few dozen numbers
+    # instead of a marker per posting
+    regions = load_regions(version)
+    features = load_features(data_stamp())
+    note(rows=features['rows'])
+    return region_counts(regions['codes'], regions['names'], features['pattern_ids'], features['patterns'], selection(filters))
+
+def region_values(counts, measure):
+    # postings, or the percent of a region's postings mentioning a skill
+    if measure == 'postings':
+        return counts['postings']
+    return (100 * counts[measure] / counts['postings'].where(counts['postings'] > 0)).round(1)
+
+def load_choropleth(measure, filters):
+    folium = lazy_import('folium')
+    version = load_dataset_version()
+    regions = load_regions(version)
+    counts = region_table(version, filters)
+    values = region_values(counts, measure)
+
+    # the value of every region rides along in its properties for the tooltip
+    geojson = {'type': 'FeatureCollection', 'features': [
+        dict(feature, properties={'name': name, 'jobs': int(counts['postings'][name]), 'value': None if pd.isna(values[name]) else float(values[name])})
+        for feature, name in zip(regions['geojson']['features'], regions['names'])
+    ]}
+    map = folium.Map(location=MAP_CENTER, zoom_start=MAP_ZOOM)
+    choropleth = folium.Choropleth(
+        geo_data=geojson, data=values.dropna(), key_on='feature.properties.name', fill_color='Blues',
+        nan_fill_color='#444444', line_weight=0.5, legend_name='jobs' if measure == 'postings' else f"% of jobs mentioning {measure}",
+    ).add_to(map)
+    choropleth.geojson.add_child(folium.GeoJsonTooltip(['name', 'jobs', 'value'], aliases=['', 'jobs', measure]))
     return map
 
-def work_type():
-    work_type = dict(data_analyst['work_type'].fillna("Not-Specified").value_counts())
+@cached_chart
+def work_type(filters):
+    work_type = load_aggregates(filters)['work_type']
 
-    work_type_df = pd.DataFrame.from_dict(work_type, orient='index').reset_index()
-    work_type_df.columns = ['work_type', 'count']
+    # built from the items so a filter that matches nothing still has columns
+    work_type_df = pd.DataFrame(list(work_type.items()), columns=['work_type', 'count'])
     
+    px = lazy_import('plotly.express')
     return px.pie(work_type_df, values='count', names='work_type', color_discrete_sequence=["#636EFA", "#EF553B"])
 
 
-def job_applicant():
-    jobs_applicant = {
-        '0': data_analyst[data_analyst['applicant_count'] == 0]['applicant_count'].count(),
-        '1-19': data_analyst[(data_analyst['applicant_count'] >= 1) & (data_analyst['applicant_count'] <= 19)]['applicant_count'].count(),
-    }
-    for start in range(20, 200, 20):
-        jobs_applicant[f"{start}-{start+19}"] = data_analyst[(data_analyst['applicant_count'] >= start) & (data_analyst['applicant_count'] < start+20)]['applicant_count'].count()
-
-    jobs_applicant['200+'] = data_analyst[data_analyst['applicant_count'] >= 200]['applicant_count'].count()
+@cached_chart
+def job_applicant(filters):
+    jobs_applicant = load_aggregates(filters)['applicants']
 
     # convert to df
     jobs_applicant_df = pd.DataFrame.from_dict(jobs_applicant, orient='index').reset_index()
     jobs_applicant_df.columns = ['applicant_count', 'count']
     # use plotly bar
+    px = lazy_import('plotly.express')
     return px.bar(jobs_applicant_df, x='applicant_count', y='count', width=800, height=500)
 
 
-def v1_t1():
-    require = [1 if a or b or c or d else 0 for a, b, c, d in zip(data_analyst['python'], data_analyst['scala'], data_analyst['r'], data_analyst['programming'])]
-    not_require = len(require) - sum(require)
-    require = sum(require)
-
-    programming_languages_pieChart = {
-        'required': require,
-        'not_required': not_require,
-    }
-    # convert to dataframe
-    programming_languages_pieChart_df = pd.DataFrame.from_dict(programming_languages_pieChart, orient='index').reset_index()
-    programming_languages_pieChart_df.columns = ['required', 'count']
-    # use plotly
-    return px.pie(programming_languages_pieChart_df, values='count', names='required', color_discrete_sequence=["#636EFA", "#EF553B"])
-
-
-
-def v1_t2():
-    programming_languages = {
-        'python': data_analyst['python'].sum(),
-        'r': data_analyst['r'].sum(),
-        'scala': data_analyst['scala'].sum(),
+@st.cache_resource(max_entries=2)
+def load_numeric(stamp):
+    values = {field: numeric_values(data_analyst, field) for field in NUMERIC_FIELDS}
+    for array in values.values():
+        array.flags.writeable = False
+    return values
+
+@counted_cache(st.cache_data(max_entries=64))
+def distribution(version, field, width, filters):
+    # bucket counts and percentiles of a numeric field over the selected
+    # postings, cached per field, bucket width and filters
+    values = load_numeric(data_stamp())[field]
+    cap = NUMERIC_FIELDS[field]['cap']
+    edges = uniform_edges(width, cap, np.nanmax(values) if np.isfinite(values).any() else None)
+    mask = selection(filters)
+    note(rows=len(values))
+
+    counts = bin_counts(bin_codes(values, edges), edges, mask)
+    labels = bin_labels(edges, cap)
+    if counts[0] == 0:
+        # nothing below the first edge, which is 0 for every field
+        counts, labels = counts[1:], labels[1:]
+    return {
+        'buckets': dict(zip(labels, counts.tolist())),
+        'percentiles': percentiles(values, PERCENTILES, cap, mask),
     }
 
-    # convert programming language to dataframe
-    programming_languages_df = pd.DataFrame.from_dict(programming_languages, orient='index').reset_index()
-    programming_languages_df.columns = ['programming_language', 'count']
-    # sort
-    programming_languages_df = programming_languages_df.sort_values(by='count', ascending=False)
-    # visualize with plotly barchart
-    return px.bar(programming_languages_df, x='programming_language', y='count', color='programming_language')
-
+@cached_chart
+def distribution_chart(field, width, filters):
+    buckets = distribution(load_dataset_version(), field, width, filters)['buckets']
+    buckets_df = pd.DataFrame(list(buckets.items()), columns=[field, 'count'])
+    px = lazy_import('plotly.express')
+    return px.bar(buckets_df, x=field, y='count', width=800, height=500)
 
-def v1_t3():
-    programming_language_venn = {
-        'python': set(),
-        'r': set(),
-        'scala': set(),
-    }
-    for id, py, r, sc in zip(
-        list(data_analyst['id']), 
-        list(data_analyst['python']), 
-        list(data_analyst['r']), 
-        list(data_analyst['scala'])):
-        
-        if py: programming_language_venn['python'].add(id)
-        if r: programming_language_venn['r'].add(id)
-        if sc: programming_language_venn['scala'].add(id)
-
-    # change figsize
-    fig, ax = plt.subplots(nrows=1, ncols=1)
-    # ax.set_facecolor((0.1, 0.2, 0.5))
-
-    venn(programming_language_venn, figsize=(12, 12), ax=ax)
-
-    return fig
-
-def v2_t1():
-    require = [
-        1 if i or b or c or d or e or f or g or h or a else 0 for a, b, c, d, e, f, g, h, i in zip(
-            data_analyst['talend'], 
-            data_analyst['dataiku'], 
-            data_analyst['pentaho'], 
-            data_analyst['snowflake'], 
-            data_analyst['hive'], 
-            data_analyst['spark'], 
-            data_analyst['kafka'], 
-            data_analyst['kinesis'], 
-            data_analyst['etl']
-        )
-    ]
-    not_require = len(require) - sum(require)
-    require = sum(require)
+def skill_counts(skills, filters):
+    counts = load_aggregates(filters)['skills']
+    return {skill: counts[skill] for skill in skills}
 
-    software_pieChart = {
+def required_pie(require, filters, colors):
+    pieChart = {
         'required': require,
-        'not_required': not_require,
+        'not_required': load_aggregates(filters)['rows'] - require,
     }
     # convert to dataframe
-    software_pieChart_df = pd.DataFrame.from_dict(software_pieChart, orient='index').reset_index()
-    software_pieChart_df.columns = ['required', 'count']
-    # use plotly bar
-    
-    return px.pie(software_pieChart_df, values='count', names='required', color_discrete_sequence=["#EF553B", "#636EFA"])
-
-def v2_t2():
-    etl_counts = {
-        'talend': data_analyst[data_analyst['talend'] == True].shape[0],
-        'dataiku': data_analyst[data_analyst['dataiku'] == True].shape[0],
-        'pentaho': data_analyst[data_analyst['pentaho'] == True].shape[0],
-        'snowflake': data_analyst[data_analyst['snowflake'] == True].shape[0],
-        'hive': data_analyst[data_analyst['hive'] == True].shape[0],
-        'spark': data_analyst[data_analyst['spark'] == True].shape[0],
-        'kafka': data_analyst[data_analyst['kafka'] == True].shape[0],
-        'kinesis': data_analyst[data_analyst['kinesis'] == True].shape[0],
-        'etl': data_analyst[data_analyst['etl'] == True]['etl'].count(),
-    }
-    # convert to dataframe
-    etl_counts_df = pd.DataFrame.from_dict(etl_counts, orient='index').reset_index()
-    etl_counts_df.columns = ['etl', 'count']
-    # sort
-    etl_counts_df = etl_counts_df.sort_values(by='count', ascending=False)
+    pieChart_df = pd.DataFrame.from_dict(pieChart, orient='index').reset_index()
+    pieChart_df.columns = ['required', 'count']
     # use plotly
-    return px.bar(etl_counts_df, x='etl', y='count', color='etl')
-
-def v3_t1():
-    require = [
-        1 if a or b or c or d or e or f or g or h else 0 for a, b, c, d, e, f, g, h in zip(
-            data_analyst['matplotlib'],
-            data_analyst['seaborn'],
-            data_analyst['plotly'],
-            data_analyst['bokeh'],
-            data_analyst['tableau'],
-            data_analyst['redash'],
-            data_analyst['powerbi'],
-            data_analyst['data_visualization'])
-    ]
-    not_require = len(require) - sum(require)
-    require = sum(require)
-
-    software_pieChart = {
-        'required': require,
-        'not_required': not_require,
-    }
-    # convert to dataframe
-    software_pieChart_df = pd.DataFrame.from_dict(software_pieChart, orient='index').reset_index()
-    software_pieChart_df.columns = ['required', 'count']
-    # use plotly bar
+    px = lazy_import('plotly.express')
+    return px.pie(pieChart_df, values='count', names='required', color_discrete_sequence=colors)
 
-    
-    return px.pie(software_pieChart_df, values='count', names='required', color_discrete_sequence=["#636EFA", "#EF553B"])
-
-def v3_t2():
-    data_vis={
-        'matplotlib': data_analyst[data_analyst['matplotlib'] == True]['matplotlib'].count(),
-        'seaborn': data_analyst[data_analyst['seaborn'] == True]['seaborn'].count(), 
-        'plotly':  data_analyst[data_analyst['plotly'] == True]['plotly'].count(),
-        'bokeh': data_analyst[data_analyst['bokeh'] == True]['bokeh'].count(),
-        'tableau': data_analyst[data_analyst['tableau'] == True]['tableau'].count(),
-        'redash': data_analyst[data_analyst['redash'] == True]['redash'].count(),
-        'powerbi': data_analyst[data_analyst['powerbi'] == True]['powerbi'].count(),
-        'data_visualization': data_analyst[data_analyst['data_visualization'] == True]['data_visualization'].count(),
-    }
+def count_bar(counts, name):
     # convert to dataframe
-    data_vis_df = pd.DataFrame.from_dict(data_vis, orient='index').reset_index()
-    data_vis_df.columns = ['data_visualization', 'count']
+    counts_df = pd.DataFrame.from_dict(counts, orient='index').reset_index()
+    counts_df.columns = [name, 'count']
     # sort
-    data_vis_df = data_vis_df.sort_values(by='count', ascending=False)
+    counts_df = counts_df.sort_values(by='count', ascending=False)
     # use plotly
-    return px.bar(data_vis_df, x='data_visualization', y='count', color='data_visualization')
+    px = lazy_import('plotly.express')
+    return px.bar(counts_df, x=name, y='count', color=name)
+
+
+def venn_key(diagram):
+    # hashable description of a diagram's grouping, part of the image cache key
+    return tuple((label, tuple(skills)) for label, skills in VENN_DIAGRAMS[diagram].items())
+
+@counted_cache(st.cache_data(max_entries=32))
+def venn_image(version, diagram, sets, filters, image_format='png'):
+    # rendered once per dataset version and grouping, every rerun and session
+    # after that is served the cached bytes instead of running matplotlib
+    sets = {label: list(skills) for label, skills in sets}
+    regions = load_aggregates(filters)['venn'][diagram]
+
+    Figure = lazy_import('matplotlib.figure').Figure
+    venn = lazy_import('venn')
+
+    fig = Figure()
+    ax = fig.subplots(nrows=1, ncols=1)
+    venn.draw_venn(
+        petal_labels=regions, dataset_labels=sets.keys(), hint_hidden=False,
+        colors=venn.generate_colors(n_colors=len(sets)), figsize=(12, 12), fontsize=13,
+        legend_loc="upper right", ax=ax,
+    )
 
-def v3_t3():
-    data_vis_venn = {
-        'tableau': set(),
-        'redash': set(),
-        'powerbi': set(),
-    }
-    for id, tableau, redash, powerbi in zip(
-        list(data_analyst['id']), 
-        list(data_analyst['tableau']),
-        list(data_analyst['redash']),
-        list(data_analyst['powerbi'])):
-
-        if tableau: data_vis_venn['tableau'].add(id)
-        if redash: data_vis_venn['redash'].add(id)
-        if powerbi: data_vis_venn['powerbi'].add(id)
-
-    # change figsize
-    fig, ax = plt.subplots(nrows=1, ncols=1)
-    # ax.set_facecolor((0.1, 0.2, 0.5))
-
-    venn(data_vis_venn, figsize=(12, 12), ax=ax)
-
-    return fig
-
-def v4_t1():
-    require = [
-        1 if a or b or c or d or e or f or g or h or i else 0 for a, b, c, d, e, f, g, h, i in zip(
-            data_analyst['mysql'],
-            data_analyst['postgresql'],
-            data_analyst['sql'],
-            data_analyst['mongodb'],
-            data_analyst['redis'],
-            data_analyst['sqlite'],
-            data_analyst['sql server'],
-            data_analyst['bigquery'],
-            data_analyst['nosql'])
-    ]
-    not_require = len(require) - sum(require)
-    require = sum(require)
-
-    database_pieChart = {
-        'required': require,
-        'not_required': not_require,
-    }
+    image = io.BytesIO()
+    fig.savefig(image, format=image_format, bbox_inches='tight')
+    return image.getvalue()
 
-    # convert to dataframe
-    database_pieChart_df = pd.DataFrame.from_dict(database_pieChart, orient='index').reset_index()
-    database_pieChart_df.columns = ['required', 'count']
-    # use plotly bar
-    return px.pie(database_pieChart_df, values='count', names='required', color_discrete_sequence=["#636EFA", "#EF553B"])
-
-def v4_t2():
-    data_db= {
-        'sql': [1 if a or b or c or d else 0 for a, b, c, d in zip(
-            data_analyst['mysql'],
-            data_analyst['postgresql'],
-            data_analyst['sql'],
-            data_analyst['sqlite'])
-        ],
-        'nosql': [1 if a or b or c else 0 for a, b, c in zip(
-            data_analyst['mongodb'],
-            data_analyst['redis'],
-            data_analyst['nosql'])
-        ],
-        'big query': [1 if a else 0 for a in data_analyst['bigquery']]
-    }
 
-    data_db['sql'] = sum(data_db['sql'])
-    data_db['nosql'] = sum(data_db['nosql'])
-    data_db['big query'] = sum(data_db['big query'])
+def venn_chart(diagram, filters):
+    image = venn_image(load_dataset_version(), diagram, venn_key(diagram), filters)
+    note(payload_bytes=len(image))
+    return image
 
-    # convert to dataframe
-    data_db_df = pd.DataFrame.from_dict(data_db, orient='index').reset_index()
-    data_db_df.columns = ['database', 'count']
-    # sort
-    data_db_df = data_db_df.sort_values(by='count', ascending=False)
-    # use plotly
-    return px.bar(data_db_df, x='database', y='count', color='database')
 
-def v4_t3():
-    database_venn = {
-        'sql': set(),
-        'nosql': set(),
-        'big query': set(),
-    }
+def lazy_tabs(labels, key):
+    # opening a tab reruns the script and only the open tab's .open is True,
+    # so the caller computes and sends that tab alone
+    return st.tabs(labels, key=key, on_change='rerun')
 
-    for id, mysql, postgresql, sql, mongodb, redis, sqlite, sql_server, bigquery, nosql in zip(
-        list(data_analyst['id']),
-        list(data_analyst['mysql']),
-        list(data_analyst['postgresql']),
-        list(data_analyst['sql']),
-        list(data_analyst['mongodb']),
-        list(data_analyst['redis']),
-        list(data_analyst['sqlite']),
-        list(data_analyst['sql server']),
-        list(data_analyst['bigquery']),
-        list(data_analyst['nosql'])):
-            
-            if mysql: database_venn['sql'].add(id)
-            if postgresql: database_venn['sql'].add(id)
-            if sql: database_venn['sql'].add(id)
-            if sqlite: database_venn['sql'].add(id)
-            if sql_server: database_venn['sql'].add(id)
-
-            if bigquery: database_venn['big query'].add(id)
-
-            if mongodb: database_venn['nosql'].add(id)
-            if redis: database_venn['nosql'].add(id)
-            if nosql: database_venn['nosql'].add(id)
-  
-    
-    # change figsize
-    fig, ax = plt.subplots(nrows=1, ncols=1)
-    # ax.set_facecolor((0.1, 0.2, 0.5))
 
-    venn(database_venn, figsize=(12, 12), ax=ax)
+@cached_chart
+def v1_t1(filters):
+    return required_pie(load_aggregates(filters)['groups']['programming'], filters, ["#636EFA", "#EF553B"])
 
-    return fig
 
+@cached_chart
+def v1_t2(filters):
+    return count_bar(skill_counts(['python', 'r', 'scala'], filters), 'programming_language')
 
-def v4_t4():
-    data_db= {
-        'mysql': [1 if a else 0 for a in data_analyst['mysql']],
-        'postgresql': [1 if a else 0 for a in data_analyst['postgresql']],
-        'sql': [1 if a else 0 for a in data_analyst['sql']],
-        'sqlite': [1 if a else 0 for a in data_analyst['sqlite']],
-        'big query': [1 if a else 0 for a in data_analyst['bigquery']],
-    }
 
-    data_db['mysql'] = sum(data_db['mysql'])
-    data_db['postgresql'] = sum(data_db['postgresql'])
-    data_db['sql'] = sum(data_db['sql'])
-    data_db['sqlite'] = sum(data_db['sqlite'])
-    data_db['big query'] = sum(data_db['big query'])
+def v1_t3(filters):
+    return venn_chart('programming', filters)
 
+@cached_chart
+def v2_t1(filters):
+    return required_pie(load_aggregates(filters)['groups']['etl'], filters, ["#EF553B", "#636EFA"])
 
-    # convert to dataframe
-    data_db_df = pd.DataFrame.from_dict(data_db, orient='index').reset_index()
-    data_db_df.columns = ['SQL Database', 'count']
-    # sort
-    data_db_df = data_db_df.sort_values(by='count', ascending=False)
-    # use plotly
-    return px.bar(data_db_df, x='SQL Database', y='count', color='SQL Database')
+@cached_chart
+def v2_t2(filters):
+    return count_bar(skill_counts(SKILL_GROUPS['etl'], filters), 'etl')
 
+@cached_chart
+def v3_t1(filters):
+    return required_pie(load_aggregates(filters)['groups']['visualization'], filters, ["#636EFA", "#EF553B"])
 
-def v5():
-    other_skills = ['communication', 'deployment', 'english', 'excel', 'git']
-    require = data_analyst.loc[:, other_skills].sum(axis=0)
+@cached_chart
+def v3_t2(filters):
+    return count_bar(skill_counts(SKILL_GROUPS['visualization'], filters), 'data_visualization')
 
+def v3_t3(filters):
+    return venn_chart('visualization', filters)
 
-    communication = {
-        'required': require['communication'],
-        'not_required': len(data_analyst) - require['communication'],
-    }
-    deployment = {
-        'required': require['deployment'],
-        'not_required': len(data_analyst) - require['deployment'],
-    }
-    english = {
-        'required': require['english'],
-        'not_required': len(data_analyst) - require['english'],
-    }
+@cached_chart
+def v4_t1(filters):
+    return required_pie(load_aggregates(filters)['groups']['databases'], filters, ["#636EFA", "#EF553B"])
 
-    excel = {
-        'required': require['excel'],
-        'not_required': len(data_analyst) - require['excel'],
-    }
-    git = {
-        'required': require['git'],
-        'not_required': len(data_analyst) - require['git'],
-    }
+@cached_chart
+def v4_t2(filters):
+    groups = load_aggregates(filters)['groups']
+    return count_bar({name: groups[name] for name in ['sql', 'nosql', 'big query']}, 'database')
 
+def v4_t3(filters):
+    return venn_chart('databases', filters)
 
 
-    communication_df = pd.DataFrame.from_dict(communication, orient='index').reset_index()
-    deployment_df = pd.DataFrame.from_dict(deployment, orient='index').reset_index()
-    english_df = pd.DataFrame.from_dict(english, orient='index').reset_index()
-    excel_df = pd.DataFrame.from_dict(excel, orient='index').reset_index()
-    git_df = pd.DataFrame.from_dict(git, orient='index').reset_index()
+@cached_chart
+def v4_t4(filters):
+    counts = skill_counts(['mysql', 'postgresql', 'sql', 'sqlite'], filters)
+    counts['big query'] = load_aggregates(filters)['skills']['bigquery']
+    return count_bar(counts, 'SQL Database')
 
 
-    communication_df.columns = ['required', 'count']
-    deployment_df.columns = ['required', 'count']
-    english_df.columns = ['required', 'count']
-    excel_df.columns = ['required', 'count']
-    git_df.columns = ['required', 'count']
-    
-    # visualize
-    return (
-        px.pie(communication_df, values='count', names='required', color_discrete_sequence=["#EF553B", "#636EFA"]),
-        px.pie(deployment_df, values='count', names='required', color_discrete_sequence=["#EF553B", "#636EFA"]),
-        px.pie(english_df, values='count', names='required', color_discrete_sequence=["#EF553B", "#636EFA"]),
-        px.pie(excel_df, values='count', names='required', color_discrete_sequence=["#EF553B", "#636EFA"]),
-        px.pie(git_df, values='count', names='required', color_discrete_sequence=["#EF553B", "#636EFA"]),
-    )
+@cached_chart
+def v5(skill, filters):
+    # one "Other Skills" pie, only built for the tab that is open
+    return required_pie(load_aggregates(filters)['skills'][skill], filters, ["#EF553B", "#636EFA"])
 
-@st.cache
-def _how_many_jobs_df():
-    all_skills = ['python', 'r', 'scala', 'spark', 'kafka', 'talend', 'pentaho', 'hive', 'tableau', 'powerbi', 'redash', 'sql', 'nosql', 'bigquery', 'communication', 'deployment', 'english', 'excel', 'git']
-    return data_analyst.loc[:, all_skills]
+@cached_chart
+def cooccurrence_heatmap(metric, filters):
+    # every skill pair at once, row skill A against column skill B
+    frame = cooccurrence_stats(load_aggregates(filters))[metric]
+    px = lazy_import('plotly.express')
+    if metric == 'lift':
+        # above 1 the pair occurs together more often than chance
+        return px.imshow(frame, aspect='auto', height=900, color_continuous_scale='RdBu_r', color_continuous_midpoint=1, labels={'x': 'B', 'y': 'A', 'color': 'lift'})
+    return px.imshow(frame, aspect='auto', height=900, labels={'x': 'B', 'y': 'A', 'color': metric})
 
-def how_many_jobs(core_skills, soft_skills):
-    jobs = _how_many_jobs_df()
+@st.cache_resource(max_entries=2)
+def load_timeline(version):
+    # partition names only, the partitions themselves are read per trend. they
+    # are partitioned again when they don't hold this version
+    ensure_timeline()
+    return {resolution: periods(resolution) for resolution in RESOLUTIONS}
 
-    all_skills = ['python', 'r', 'scala', 'spark', 'kafka', 'talend', 'pentaho', 'hive', 'tableau', 'powerbi', 'redash', 'sql', 'nosql', 'bigquery', 'communication', 'deployment', 'english', 'excel', 'git']
+@counted_cache(st.cache_data(max_entries=32))
+def load_trend(version, resolution, start, end):
+    # per-period aggregates merged from the partitions between start and end
+    aggregates = trend(resolution, start, end)
+    note(rows=sum(period['rows'] for period in aggregates.values()))
+    return aggregates
 
-    skills = {k: True if k in core_skills + soft_skills else False for k in all_skills}
+@cached_chart
+def skill_trend(resolution, start, end, skills):
+    # share of each period's postings that mention the skill
+    aggregates = load_trend(load_dataset_version(), resolution, start, end)
+    trend_df = pd.DataFrame(
+        [(period, skill, 100 * counts['skills'][skill] / counts['rows']) for period, counts in aggregates.items() for skill in skills],
+        columns=[resolution, 'skill', 'percent'],
+    )
+    px = lazy_import('plotly.express')
+    return px.line(trend_df, x=resolution, y='percent', color='skill', markers=True, height=450)
+
+@cached_chart
+def work_type_trend(resolution, start, end):
+    aggregates = load_trend(load_dataset_version(), resolution, start, end)
+    trend_df = pd.DataFrame(
+        [(period, work_type, count) for period, counts in aggregates.items() for work_type, count in counts['work_type'].items()],
+        columns=[resolution, 'work_type', 'count'],
+    )
+    px = lazy_import('plotly.express')
+    return px.histogram(trend_df, x=resolution, y='count', color='work_type', barnorm='percent', height=450)
 
-    can_apply = 0
-    cannot_apply = 0
-    for _, job in jobs.iterrows():
-        can_apply_current_job = True
-        for skill, state in skills.items():
-            if job[skill] == True and state == False:
-                can_apply_current_job = False
-                break
-        if can_apply_current_job:
-            can_apply += 1
-        else:
-            cannot_apply += 1
+@counted_cache(st.cache_resource(max_entries=64))
+def _load_signature_table(version, filters):
+    table = signature_table(load_aggregates(filters))
+    for values in table:
+        values.flags.writeable = False
+    return table
+
+def load_signature_table(filters):
+    return _load_signature_table(load_dataset_version(), filters)
+
+@cached_chart
+def how_many_jobs(core_skills, soft_skills, filters):
+    table = load_signature_table(filters)
+    note(rows=len(table[0]))
+
+    can_apply = signature_matches(table, skill_mask(core_skills + soft_skills))
+    cannot_apply = load_aggregates(filters)['rows'] - can_apply
 
     my_jobs = {
         '100% Match': can_apply,
@@ -441,23 +438,131 @@ def how_many_jobs(core_skills, soft_skills):
         # reverse colors
         colors = colors[::-1]
 
+    px = lazy_import('plotly.express')
     return px.pie(my_jobs_df, values='count', names='can_apply', color_discrete_sequence=colors)
 
-
-
+def next_skill(core_skills, soft_skills, filters):
+    return best_missing_skill(load_signature_table(filters), skill_mask(core_skills + soft_skills), MATCH_SKILLS)
+
+@counted_cache(st.cache_data(max_entries=64))
+def best_matches(version, core_skills, soft_skills, weighted, filters, k=20):
+    features = load_features(data_stamp())
+    have = skill_mask(core_skills + soft_skills)
+    considered = skill_mask(MATCH_SKILLS)
+
+    weights = None
+    if weighted:
+        # rarer skills weigh more: inverse document frequency over the
+        # selected postings
+        aggregates = load_aggregates(filters)
+        counts = np.array([aggregates['skills'][skill] for skill in SKILL_COLUMNS], dtype=np.float64)
+        weights = np.log((aggregates['rows'] + 1) / (counts + 1))
+
+    # scored once per distinct skill mask, then spread to the postings
+    scores = match_scores(features['patterns'], have, considered, weights)[features['pattern_ids']]
+    note(rows=len(scores))
+    mask = selection(filters)
+    if mask is not None:
+        scores = np.where(mask, scores, -1.0)
+
+    top = top_k(scores, k)
+    top = top[scores[top] > 0]
+    postings = data_analyst.iloc[top]
+    missing = features['patterns'][features['pattern_ids'][top]] & considered & ~have
+    return pd.DataFrame({
+        'title': postings['title'].to_numpy(),
+        'company': postings['company'].to_numpy(),
+        'location': postings['location'].to_numpy(),
+        'match': scores[top].round(2),
+        'missing skills': [', '.join(skill_names(required)) for required in missing],
+    })
+
+
+
+
+
+@st.cache_resource(max_entries=2)
+def load_search_index(version):
+    return snapshot['search'] if snapshot is not None else current_search_index(version)
+
+@counted_cache(st.cache_data(max_entries=64))
+def search_postings(version, query, skills, filters, k=20):
+    # bm25 over the descriptions, narrowed to postings that mention every
+    # picked skill and match the sidebar filters
+    scores = bm25_scores(load_search_index(version), query)
+    note(rows=len(scores))
+
+    mask = selection(filters)
+    if skills:
+        features = load_features(data_stamp())
+        required = skill_mask(skills)
+        has_skills = ((features['patterns'] & required) == required)[features['pattern_ids']]
+        mask = has_skills if mask is None else mask & has_skills
+    if mask is not None:
+        scores = np.where(mask, scores, 0.0)
+
+    top = top_k(scores, k)
+    top = top[scores[top] > 0]
+    postings = data_analyst.iloc[top]
+    return pd.DataFrame({
+        'title': postings['title'].to_numpy(),
+        'company': postings['company'].to_numpy(),
+        'location': postings['location'].to_numpy(),
+        'score': scores[top].round(2),
+    })
+
+
+# sidebar filters apply to every section below, options are ordered by how
+# many postings have them
+with section('filters'):
+    facet_index = load_facet_index(data_stamp())
+    st.sidebar.markdown("## Filters")
+    filters = normalize_filters({
+        facet: st.sidebar.multiselect(label, facet_index['facets'][facet]['values'], key=f"facet_{facet}")
+        for facet, label in FACET_LABELS.items()
+    })
+    if st.sidebar.toggle("Count reposts once", key='count_clusters', help="Postings with near-identical descriptions are counted as one job"):
+        filters += (COUNT_CLUSTERS,)
+    st.sidebar.caption(f"{load_aggregates(filters)['rows']} jobs")
 
 
 st.markdown("<h1 style='text-align: center; color: white;'>The State of Data Analyst Jobs in Indonesia LinkedIn Jobs</h1>", unsafe_allow_html=True)
 st.markdown("<hr>", unsafe_allow_html=True)
 st.markdown("<h2 style='text-align: center; color: white;'>Jobs Location</h2>", unsafe_allow_html=True)
 st.markdown("<p style='text-align: center; color: white;'>Mayoritas pekerjaan berada pada Jakarta atau Jawa Barat.</p>", unsafe_allow_html=True)
-st_folium(load_map(), width=1800)
+# the map is rebuilt for the zoom level the user last left it at
+map_view = st.session_state.get('jobs_map') or {}
+map_zoom = map_view.get('zoom') or MAP_ZOOM
+map_center = map_view.get('center') or {'lat': MAP_CENTER[0], 'lng': MAP_CENTER[1]}
+has_regions = load_regions(load_dataset_version()) is not None
+map_layer = st.radio("Show", ["Postings", "Provinces"], horizontal=True, key='map_layer') if has_regions else "Postings"
+if map_layer == "Postings":
+    with section('map'):
+        lazy_import('streamlit_folium').st_folium(
+            load_map(map_zoom, map_view.get('bounds'), filters),
+            key='jobs_map', width=1800, zoom=map_zoom, center=(map_center['lat'], map_center['lng']),
+            returned_objects=['zoom', 'center', 'bounds'],
+        )
+else:
+    measure = st.selectbox("Shade by", ['postings'] + SKILL_COLUMNS, key='region_measure')
+    with section('regions'):
+        lazy_import('streamlit_folium').st_folium(load_choropleth(measure, filters), key='regions_map', width=1800, returned_objects=[])
+        counts = region_table(load_dataset_version(), filters)
+        located_jobs = counts['postings'].sum()
+        top = counts['postings'].sort_values(ascending=False)
+        if located_jobs:
+            st.caption(f"{' and '.join(top.index[:2])}: {100 * top.iloc[:2].sum() / located_jobs:.0f}% of the {located_jobs} jobs placed in a province, {counts.attrs['outside']} jobs fall outside every province")
+        regions_df = pd.DataFrame({'jobs': top})
+        if measure != 'postings':
+            regions_df[f"% {measure}"] = region_values(counts, measure)[top.index]
+        st.dataframe(regions_df.head(10), width='stretch')
 
 _, middle, _ = st.columns([1, 4, 1])
 
 with middle:
     st.markdown("<h3 style='text-align: center; color: white;'>Work Type</h3>", unsafe_allow_html=True)
-    st.write(work_type())
+    with section('work_type'):
+        st.write(work_type(filters))
     st.markdown(r"""
         <p style='color: white;'>
         Pada saat ini mayoritas pekerjaan merupakan On-Site (36.6%) diikuti dengan Hybrid (21.1%) lalu Remote (7.51%).<br>
@@ -472,7 +577,8 @@ with middle:
 
     st.markdown("<h3 style='text-align: center; color: white;'>Applicants Count</h3>", unsafe_allow_html=True)
 
-    st.plotly_chart(job_applicant())
+    with section('job_applicant'):
+        st.plotly_chart(job_applicant(filters), key='job_applicant')
     st.markdown(r"""
         <p style='color: white;'>
         Informasi jumlah kandidat dalam LinkedIn memiliki batas 200, dalam kata lain jika sudah melalui batas tersebut maka kita hanya diberi informasi bahwa pekerjaan tersebut memiliki kandidat lebih dari 200. Demikian, jika kita berasumsi bahwa satu postingan pekerjaan hanya mencari satu kandidat, maka seminimal-minimalnya kita harus menjadi kandidat top 0.5%.<br><br>
@@ -489,6 +595,19 @@ with middle:
 
     
 
+    st.markdown("<h3 style='text-align: center; color: white;'>Distributions</h3>", unsafe_allow_html=True)
+    field_column, width_column = st.columns(2)
+    field = field_column.selectbox("Field", list(NUMERIC_FIELDS), format_func=lambda field: NUMERIC_FIELDS[field]['label'], key='distribution_field')
+    width = width_column.number_input("Bucket width", min_value=1, value=NUMERIC_FIELDS[field]['width'], key=f"distribution_width_{field}")
+    with section('distribution'):
+        st.plotly_chart(distribution_chart(field, int(width), filters), key='distribution')
+        cap = NUMERIC_FIELDS[field]['cap']
+        st.dataframe(pd.DataFrame(
+            [(f"p{percent}", '-' if value is None else (f"{cap}+" if value == cap else f"{value:.1f}"))
+             for percent, value in distribution(load_dataset_version(), field, int(width), filters)['percentiles'].items()],
+            columns=['percentile', NUMERIC_FIELDS[field]['label']],
+        ).set_index('percentile').T)
+
 st.markdown("<hr>", unsafe_allow_html=True)
 st.markdown("<h2 style='text-align: center; color: white;'>Core Skills</h2>", unsafe_allow_html=True)
 
@@ -497,13 +616,16 @@ st.markdown("<h2 style='text-align: center; color: white;'>Core Skills</h2>", un
 visualization_1, explanation_1 = st.columns([3, 2])
 
 with visualization_1:
-    tab1, tab2, tab3 = st.tabs(["Pie Chart", "Bar Plot", "Venn Diagram"])
-    with tab1:
-        st.plotly_chart(v1_t1())
-    with tab2:
-        st.plotly_chart(v1_t2())
-    with tab3:
-        st.pyplot(v1_t3())
+    tab1, tab2, tab3 = lazy_tabs(["Pie Chart", "Bar Plot", "Venn Diagram"], key='programming_tab')
+    if tab1.open:
+        with tab1, section('v1_t1'):
+            st.plotly_chart(v1_t1(filters), key='v1_t1')
+    if tab2.open:
+        with tab2, section('v1_t2'):
+            st.plotly_chart(v1_t2(filters), key='v1_t2')
+    if tab3.open:
+        with tab3, section('v1_t3'):
+            st.image(v1_t3(filters))
 
 with explanation_1:
     st.markdown("<h3 style='text-align: center; color: white;'>Programming Languages</h3>", unsafe_allow_html=True)
@@ -521,11 +643,13 @@ with explanation_1:
 explanation_2, visualization_2 = st.columns([2, 3])
 
 with visualization_2:
-    tab1, tab2 = st.tabs(["Pie Chart", "Bar Plot"])
-    with tab1:
-        st.plotly_chart(v2_t1())
-    with tab2:
-        st.plotly_chart(v2_t2())
+    tab1, tab2 = lazy_tabs(["Pie Chart", "Bar Plot"], key='etl_tab')
+    if tab1.open:
+        with tab1, section('v2_t1'):
+            st.plotly_chart(v2_t1(filters), key='v2_t1')
+    if tab2.open:
+        with tab2, section('v2_t2'):
+            st.plotly_chart(v2_t2(filters), key='v2_t2')
 
 with explanation_2:
     
@@ -542,13 +666,16 @@ with explanation_2:
 visualization_3, explanation_3 = st.columns([3, 2])
 
 with visualization_3:
-    tab1, tab2, tab3 = st.tabs(["Pie Chart", "Bar Plot", "Venn Diagram"])
-    with tab1:
-        st.plotly_chart(v3_t1())
-    with tab2:
-        st.plotly_chart(v3_t2())
-    with tab3:
-        st.pyplot(v3_t3())
+    tab1, tab2, tab3 = lazy_tabs(["Pie Chart", "Bar Plot", "Venn Diagram"], key='visualization_tab')
+    if tab1.open:
+        with tab1, section('v3_t1'):
+            st.plotly_chart(v3_t1(filters), key='v3_t1')
+    if tab2.open:
+        with tab2, section('v3_t2'):
+            st.plotly_chart(v3_t2(filters), key='v3_t2')
+    if tab3.open:
+        with tab3, section('v3_t3'):
+            st.image(v3_t3(filters))
 
 with explanation_3:
     st.markdown("<h3 style='text-align: center; color: white;'>Data Visualizations</h3>", unsafe_allow_html=True)
@@ -566,15 +693,19 @@ with explanation_3:
 
 explanation_4, visualization_4 = st.columns([2, 3])
 with visualization_4:
-    tab1, tab2, tab3, tab4 = st.tabs(["Pie Chart", "Bar Plot", "Venn Diagram", "SQL Bar Plot"])
-    with tab1:
-        st.plotly_chart(v4_t1())
-    with tab2:
-        st.plotly_chart(v4_t2())
-    with tab3:
-        st.pyplot(v4_t3())
-    with tab4:
-        st.plotly_chart(v4_t4())
+    tab1, tab2, tab3, tab4 = lazy_tabs(["Pie Chart", "Bar Plot", "Venn Diagram", "SQL Bar Plot"], key='databases_tab')
+    if tab1.open:
+        with tab1, section('v4_t1'):
+            st.plotly_chart(v4_t1(filters), key='v4_t1')
+    if tab2.open:
+        with tab2, section('v4_t2'):
+            st.plotly_chart(v4_t2(filters), key='v4_t2')
+    if tab3.open:
+        with tab3, section('v4_t3'):
+            st.image(v4_t3(filters))
+    if tab4.open:
+        with tab4, section('v4_t4'):
+            st.plotly_chart(v4_t4(filters), key='v4_t4')
 with explanation_4:
     st.markdown("<h3 style='text-align: center; color: white;'>Databases</h3>", unsafe_allow_html=True)
     st.markdown(r"""
@@ -596,13 +727,10 @@ st.markdown("<h2 style='text-align: center; color: white;'>Other Skills</h2>", u
 
 other_skills = ['data_mining', 'communication', 'deployment', 'data_scraping', 'english']
 
-tab1, tab2, tab3, tab4, tab5 = st.tabs(["Communications", "Deployments", "English", "Excel", "Git"])
-
-communications, deployment, english, excel, git = v5()
-
+tab1, tab2, tab3, tab4, tab5 = lazy_tabs(["Communications", "Deployments", "English", "Excel", "Git"], key='other_skills_tab')
 
-with tab1:
-    explanation, visualization = st.columns([2, 3])
+if tab1.open:
+    explanation, visualization = tab1.columns([2, 3])
     with explanation:
         
         st.markdown("<h3 style='text-align: center; color: white;'>Communications</h3>", unsafe_allow_html=True)
@@ -611,11 +739,11 @@ with tab1:
         Komunikasi merupakan hal yang penting bagi Data Analyst. Dikarenakan mereka harus memberikan insight dan saran action berdasarkan data kepada stake holder. Hal ini dibuktikan dengan adanya 42.7% pekerjaan yang menyebutkannya secara eksplisit. <br><br>
         </p>
     """, unsafe_allow_html=True)
-    with visualization:
-        st.plotly_chart(communications)
+    with visualization, section('v5_communication'):
+        st.plotly_chart(v5('communication', filters), key='v5_communication')
 
-with tab2:
-    explanation, visualization = st.columns([2, 3])
+if tab2.open:
+    explanation, visualization = tab2.columns([2, 3])
     with explanation:
 
         st.markdown("<h3 style='text-align: center; color: white;'>Deployments</h3>", unsafe_allow_html=True)
@@ -624,11 +752,11 @@ with tab2:
         Deployment merupakan suatu skill yang merupakan nilai plus, 14.6% perusahan menyebutkannya secara eksplisit. Tentunya hal ini dapat menjadi nilai tambah abi seorang Data Analyst.<br><br>
         </p>
     """, unsafe_allow_html=True)
-    with visualization:
-        st.plotly_chart(deployment)
+    with visualization, section('v5_deployment'):
+        st.plotly_chart(v5('deployment', filters), key='v5_deployment')
 
-with tab3:
-    explanation, visualization = st.columns([2, 3])
+if tab3.open:
+    explanation, visualization = tab3.columns([2, 3])
     with explanation:
         
         st.markdown("<h3 style='text-align: center; color: white;'>English</h3>", unsafe_allow_html=True)
@@ -637,11 +765,11 @@ with tab3:
         Sedangkan pemahaman bahasa Inggris memiliki persentase kepentingan lebih dari Deployment dengan 27.7% perusahaan menyebutkannya secara langsung. <br><br>Tentunya hal ini sangat wajar dikarenakan ada kemungkinan besar seorang stake holder tidak dapat berbicara Bahasa Indonesia. Selain itu juga sebagai Data Analyst akan sangat sering melakukan analisis terhadap teks berbahasa inggris.
         </p>
     """, unsafe_allow_html=True)
-    with visualization:
-        st.plotly_chart(english)
+    with visualization, section('v5_english'):
+        st.plotly_chart(v5('english', filters), key='v5_english')
 
-with tab4:
-    explanation, visualization = st.columns([2, 3])
+if tab4.open:
+    explanation, visualization = tab4.columns([2, 3])
     with explanation:
         
         st.markdown("<h3 style='text-align: center; color: white;'>Excel</h3>", unsafe_allow_html=True)
@@ -650,11 +778,11 @@ with tab4:
         33.8% pekerjaan menyebutkan excel secara eksplisit hal ini menandakan teknologi ini masih sering dipergunakan dalam dunia Data Analyst. <br><br>
         </p>
     """, unsafe_allow_html=True)
-    with visualization:
-        st.plotly_chart(excel)
+    with visualization, section('v5_excel'):
+        st.plotly_chart(v5('excel', filters), key='v5_excel')
 
-with tab5:
-    explanation, visualization = st.columns([2, 3])
+if tab5.open:
+    explanation, visualization = tab5.columns([2, 3])
     with explanation:
         
         st.markdown("<h3 style='text-align: center; color: white;'>Git</h3>", unsafe_allow_html=True)
@@ -663,22 +791,115 @@ with tab5:
         Secara surprise Git bukan merupakan skill yang menurut perusahaan yang begitu penting hanya 2.82% perusahaan menyebutkannya. <br><br>
         </p>
     """, unsafe_allow_html=True)
-    with visualization:
-        st.plotly_chart(git)
+    with visualization, section('v5_git'):
+        st.plotly_chart(v5('git', filters), key='v5_git')
+
+st.markdown("<hr>", unsafe_allow_html=True)
+st.markdown("<h2 style='text-align: center; color: white;'>Skill Co-occurrence</h2>", unsafe_allow_html=True)
+st.markdown(r"""
+    <p style='color: white;'>
+    Setiap pasangan skill sekaligus: P(B | A) adalah persentase pekerjaan yang menyebutkan A yang juga menyebutkan B, sedangkan lift di atas 1 berarti kedua skill lebih sering muncul bersama dibanding kebetulan.
+    </p>
+""", unsafe_allow_html=True)
+
+tab1, tab2, tab3 = lazy_tabs(["P(B | A)", "Lift", "Count"], key='cooccurrence_tab')
+for tab, metric in ((tab1, 'conditional'), (tab2, 'lift'), (tab3, 'count')):
+    if tab.open:
+        with tab, section('cooccurrence'):
+            st.plotly_chart(cooccurrence_heatmap(metric, filters), key='cooccurrence')
+
+st.markdown("<hr>", unsafe_allow_html=True)
+st.markdown("<h2 style='text-align: center; color: white;'>Trends</h2>", unsafe_allow_html=True)
+st.markdown(r"""
+    <p style='color: white;'>
+    Tanggal posting dihitung dari waktu scraping dikurangi umur posting ("1 week ago"), jadi "1 month ago" dibulatkan menjadi 30 hari. Tren dihitung dari semua pekerjaan, tanpa filter di sidebar.
+    </p>
+""", unsafe_allow_html=True)
+
+resolution = st.radio("Per", RESOLUTIONS, index=1, horizontal=True, format_func=str.title, key='trend_resolution')
+available = load_timeline(load_dataset_version())[resolution]
+if available:
+    start, end = st.select_slider("Period", available, value=(available[0], available[-1]), key=f"trend_period_{resolution}") if len(available) > 1 else (available[0], available[0])
+    trend_skills = st.multiselect("Skills", SKILL_COLUMNS, ['python', 'sql', 'excel', 'tableau'], key='trend_skills')
+    skill_column, work_type_column = st.columns(2)
+    with skill_column, section('skill_trend'):
+        st.plotly_chart(skill_trend(resolution, start, end, trend_skills), key='skill_trend')
+    with work_type_column, section('work_type_trend'):
+        st.plotly_chart(work_type_trend(resolution, start, end), key='work_type_trend')
 
 st.markdown("<hr>", unsafe_allow_html=True)
 st.markdown("<h2 style='text-align: center; color: white;'>My 100% Match Jobs</h2>", unsafe_allow_html=True)
 
 options_core_skills = st.multiselect(
      'I Have these core skills',
-     ['python', 'r', 'scala', 'spark', 'kafka', 'talend', 'pentaho', 'hive', 'tableau', 'powerbi', 'redash', 'sql', 'nosql', 'bigquery'],
-     ['python', 'pentaho', 'sql']
+     CORE_SKILLS,
+     ['python', 'pentaho', 'sql'],
+     key='core_skills',
 )
 
 options_soft_skills  = st.multiselect(
         'I Have these other skills',
-        ['communication', 'deployment', 'english', 'excel', 'git'],
-        ['communication']
+        SOFT_SKILLS,
+        ['communication'],
+        key='soft_skills',
 )
 
-st.plotly_chart(how_many_jobs(options_core_skills, options_soft_skills))
\ No newline at end of file
+match_chart, match_suggestion = st.columns([3, 1])
+
+with match_chart, section('how_many_jobs'):
+    st.plotly_chart(how_many_jobs(options_core_skills, options_soft_skills, filters), key='how_many_jobs')
+
+with match_suggestion, section('next_skill'):
+    skill, unlocked = next_skill(options_core_skills, options_soft_skills, filters)
+    if skill is not None and unlocked > 0:
+        st.metric("Learn next", skill, f"+{unlocked} jobs")
+        st.markdown(f"<p style='color: white;'>Dengan menguasai {skill}, {unlocked} pekerjaan lagi menjadi 100% Match.</p>", unsafe_allow_html=True)
+
+st.markdown("<h3 style='text-align: center; color: white;'>Best Matching Jobs</h3>", unsafe_allow_html=True)
+rank_by = st.radio("Rank by", ["Jaccard", "Weighted overlap"], horizontal=True, key='match_rank_by')
+with section('best_matches'):
+    st.dataframe(
+        best_matches(load_dataset_version(), options_core_skills, options_soft_skills, rank_by == "Weighted overlap", filters),
+        hide_index=True, width='stretch',
+    )
+
+st.markdown("<hr>", unsafe_allow_html=True)
+st.markdown("<h2 style='text-align: center; color: white;'>Search Job Descriptions</h2>", unsafe_allow_html=True)
+
+query = st.text_input("Search descriptions", placeholder="dbt, looker, a/b testing", key='search_query')
+search_skills = st.multiselect("Mentioning these skills", SKILL_COLUMNS, key='search_skills')
+if query.strip():
+    with section('search'):
+        st.dataframe(search_postings(load_dataset_version(), query, search_skills, filters), hide_index=True, width='stretch')
+
+if PROFILE_ENABLED or st.query_params.get('profile') == '1':
+    metrics = section_metrics()
+    with st.sidebar.expander("Section metrics", expanded=True):
+        st.markdown(f"**Renders** (last {METRICS_WINDOW} per section in this process)")
+        st.dataframe(pd.DataFrame(
+            [
+                (name, render['renders'], round(render['p50'] * 1000, 1), round(render['p95'] * 1000, 1), render['rows'], round(render['payload_bytes'] / 1024, 1),
+                 None if render['hit_rate'] is None else round(render['hit_rate'], 2))
+                for name, render in metrics.items()
+            ],
+            columns=['section', 'renders', 'p50 ms', 'p95 ms', 'max rows', 'payload KB', 'hit rate'],
+        ))
+        figures = cache_stats()
+        st.caption(f"figure cache: {figures['entries']} figures, {figures['bytes'] / 1024 / 1024:.1f} MB, {figures['hits']} hits, {figures['misses']} misses, {figures['evictions']} evictions")
+        if snapshot is not None:
+            st.caption(f"precomputed snapshot {snapshot['version'][:8]}, built in {sum(snapshot['seconds'].values()):.1f}s of work: " + ", ".join(f"{task} {seconds:.1f}s" for task, seconds in snapshot['seconds'].items()))
+        else:
+            st.caption("no precomputed snapshot, aggregates are computed on request")
+
+    profile = startup_profile()
+    with st.sidebar.expander("Startup profile", expanded=True):
+        st.markdown("**Imports** (first import in this process)")
+        st.dataframe(pd.DataFrame(
+            [(name, round(seconds * 1000, 1)) for name, seconds in profile['imports'].items()],
+            columns=['module', 'ms'],
+        ))
+        st.markdown("**Sections** (first render in this process)")
+        st.dataframe(pd.DataFrame(
+            [(name, round(timing['seconds'] * 1000, 1), round(timing['finished_at'], 2)) for name, timing in profile['sections'].items()],
+            columns=['section', 'ms', 'done after start (s)'],
+        ))
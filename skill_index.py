@@ -0,0 +1,114 @@
+import numpy as np
+
+
+# boolean skill columns of input_3.csv, in file order. bit i of a posting's
+# mask is set when the posting mentions SKILL_COLUMNS[i]
+SKILL_COLUMNS = [
+    'python', 'r', 'scala',
+    'mysql', 'postgresql', 'sql', 'mongodb', 'redis', 'sqlite', 'sql server', 'bigquery', 'nosql',
+    'talend', 'dataiku', 'pentaho', 'snowflake', 'hive', 'spark', 'kafka', 'kinesis',
+    'aws', 'gcp', 'azure', 'kubernetes', 'docker', 'hadoop',
+    'excel', 'powerpoint', 'word', 'pdf', 'csv', 'sheet',
+    'matplotlib', 'seaborn', 'plotly', 'bokeh', 'd3js', 'redash', 'tableau', 'powerbi', 'data_visualization',
+    'data_mining', 'communication', 'deployment', 'data_scraping', 'programming', 'english', 'etl', 'git',
+]
+
+# skills offered by the "My 100% Match Jobs" multiselects
+CORE_SKILLS = ['python', 'r', 'scala', 'spark', 'kafka', 'talend', 'pentaho', 'hive', 'tableau', 'powerbi', 'redash', 'sql', 'nosql', 'bigquery']
+SOFT_SKILLS = ['communication', 'deployment', 'english', 'excel', 'git']
+MATCH_SKILLS = CORE_SKILLS + SOFT_SKILLS
+
+
+def build_skill_index(data, skills=SKILL_COLUMNS):
+    if len(skills) > 64:
+        raise ValueError(f"a uint64 skill index holds at most 64 skills, got {len(skills)}")
+
+    flags = data.loc[:, skills].fillna(False).to_numpy(dtype=bool)
+    # pad every row to 64 bits so the packed bytes can be viewed as one uint64
+    padded = np.zeros((len(flags), 64), dtype=bool)
+    padded[:, :len(skills)] = flags
+    packed = np.packbits(padded, axis=1, bitorder='little')
+
+    return packed.view('<u8').ravel().astype(np.uint64)
+
+
+def skill_mask(names, skills=SKILL_COLUMNS):
+    mask = 0
+    for name in names:
+        mask |= 1 << skills.index(name)
+    return np.uint64(mask)
+
+
+def build_signature_table(index, considered=None):
+    # postings grouped by their distinct requirement signature, with a count
+    # per group. every skill-set query below costs O(distinct signatures)
+    required = index if considered is None else index & considered
+    signatures, counts = np.unique(required, return_counts=True)
+    return signatures, counts
+
+
+def signature_matches(table, have):
+    signatures, counts = table
+    return int(counts[(signatures & ~have) == 0].sum())
+
+
+def unlock_counts(table, have, skills=SKILL_COLUMNS):
+    # for every skill, how many extra postings become a 100% match when it is
+    # added to `have`: exactly the postings missing that one skill only
+    signatures, counts = table
+    missing = signatures & ~have
+    one_away = (missing != 0) & ((missing & (missing - np.uint64(1))) == 0)
+
+    bits = np.log2(missing[one_away].astype(np.float64)).astype(np.int64)
+    unlocked = np.bincount(bits, weights=counts[one_away], minlength=len(skills)).astype(np.int64)
+    return dict(zip(skills, unlocked[:len(skills)]))
+
+
+def best_missing_skill(table, have, candidates, skills=SKILL_COLUMNS):
+    unlocked = unlock_counts(table, have, skills)
+    candidates = [skill for skill in candidates if not have & skill_mask([skill], skills)]
+    if not candidates:
+        return None, 0
+
+    best = max(candidates, key=lambda skill: unlocked[skill])
+    return best, int(unlocked[best])
+
+
+def skill_names(mask, skills=SKILL_COLUMNS):
+    return [skill for bit, skill in enumerate(skills) if int(mask) >> bit & 1]
+
+
+def weighted_popcount(values, weights):
+    # sum of weights[bit] over the set bits of every value: one 256-entry
+    # lookup table per byte, so it costs 8 gathers per value
+    weights = np.pad(np.asarray(weights, dtype=np.float64), (0, 64 - len(weights))).reshape(8, 8)
+    byte_bits = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder='little')
+    tables = byte_bits @ weights.T
+
+    value_bytes = np.asarray(values, dtype='<u8').view(np.uint8).reshape(-1, 8)
+    return tables[value_bytes, np.arange(8)].sum(axis=1)
+
+
+def match_scores(index, have, considered=None, weights=None):
+    # how well `have` covers each posting's required skills, between 0 and 1.
+    # without weights it is the jaccard index |have & required| / |have | required|,
+    # with per-skill weights the weighted share of the required skills the
+    # user has. postings that require nothing score 0
+    required = index if considered is None else index & considered
+    if weights is None:
+        common = np.bitwise_count(required & have)
+        total = np.bitwise_count(required | have)
+    else:
+        common = weighted_popcount(required & have, weights)
+        total = weighted_popcount(required, weights)
+    return np.divide(common, total, out=np.zeros(len(required)), where=(required != 0) & (total > 0))
+
+
+def top_k(scores, k):
+    # positions of the k highest scores, best first. argpartition finds them
+    # in linear time and only those k get sorted, ties keep posting order
+    k = min(k, len(scores))
+    if k == 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.lexsort((top, -scores[top]))]
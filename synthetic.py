@@ -0,0 +1,37 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from dataset import CSV_PATH
+
+
+# spread in degrees added to every resampled coordinate, so scaled datasets
+# keep the city clusters of the original without stacking on exact points
+COORDINATE_JITTER = 0.02
+
+
+def generate_postings(base, scale, seed=0):
+    # `scale` times as many postings as `base`, same columns and dtypes.
+    # every synthetic posting copies a whole base posting, so skill
+    # frequencies, skill co-occurrence and the location, work type and
+    # applicant distributions match the original, then gets a fresh id,
+    # jittered coordinates and a tagged description
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(base), int(len(base) * scale))
+    postings = base.iloc[rows].reset_index(drop=True)
+
+    postings['id'] = np.arange(1, len(postings) + 1, dtype=np.int64) + int(base['id'].max())
+    for column in ('lat', 'lng'):
+        postings[column] = postings[column] + rng.normal(0, COORDINATE_JITTER, len(postings))
+    if 'description' in postings:
+        postings['description'] = postings['description'].astype(object) + ' ref-' + postings['id'].astype(str)
+    return postings
+
+
+if __name__ == '__main__':
+    # python synthetic.py <scale> <output.csv> [seed]
+    if len(sys.argv) < 3:
+        sys.exit("usage: python synthetic.py <scale> <output.csv> [seed]")
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    generate_postings(pd.read_csv(CSV_PATH), float(sys.argv[1]), seed).to_csv(sys.argv[2], index=False)
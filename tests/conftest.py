@@ -0,0 +1,6 @@
+import os
+import sys
+
+
+# the modules live at the repository root, next to server.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
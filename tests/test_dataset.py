@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import freeze_aggregates
+from dataset import ROLE_COLUMNS, freeze, read_postings, write_postings
+from skill_index import SKILL_COLUMNS
+
+
+def snapshot_frame(tmp_path):
+    # a few postings with every kind of column the snapshot stores, missing
+    # values included, read back the way the app reads them
+    postings = pd.DataFrame({
+        'id': [1, 2, 3],
+        'title': ['Data Analyst', 'BI Analyst', None],
+        'company': ['Paper.id', 'Gojek', 'Tokopedia'],
+        'work_type': ['On-site', None, 'Remote'],
+        'applicant_count': [12, None, 200],
+        'lat': [-6.2, np.nan, -7.25],
+        'lng': [106.8, np.nan, 112.75],
+        'posted_on': ['2022-07-28', None, '2022-08-01'],
+        'scraped_at': ['2022-08-04'] * 3,
+        **{column: [1, None, 0] for column in ROLE_COLUMNS},
+        **{column: [True, False, None] for column in SKILL_COLUMNS},
+    })
+    path = str(tmp_path / 'postings.arrow')
+    write_postings(postings, path)
+    return read_postings(path)
+
+
+def test_frozen_frame_rejects_writes_to_every_column(tmp_path):
+    frozen = freeze(snapshot_frame(tmp_path))
+    for name in frozen.columns:
+        before = frozen[name].copy()
+        value = frozen.loc[2, name] if not pd.isna(frozen.loc[2, name]) else frozen.loc[1, name]
+        # pandas retries a refused datetime write as a dtype upcast and
+        # reports it as an internal AssertionError instead
+        with pytest.raises((ValueError, AssertionError)):
+            frozen.loc[0, name] = value
+        pd.testing.assert_series_equal(frozen[name], before, obj=name)
+
+
+def test_frozen_frame_keeps_the_values(tmp_path):
+    data = snapshot_frame(tmp_path)
+    frozen = freeze(data)
+    pd.testing.assert_frame_equal(frozen.astype(data.dtypes.to_dict()), data)
+
+
+def test_frozen_aggregates_reject_writes():
+    aggregates = freeze_aggregates({'total': 3, 'skills': {'python': 2}})
+    with pytest.raises(TypeError):
+        aggregates['total'] = 4
+    with pytest.raises(TypeError):
+        aggregates['skills']['python'] += 1
+    assert aggregates['skills']['python'] == 2
@@ -0,0 +1,37 @@
+import os
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from dedup import DUPLICATE_THRESHOLD, find_clusters, one_per_cluster, shingles
+
+
+# frozen copy of the bundled postings, ingest.py keeps appending to the live csv
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'postings.csv')
+
+
+def near_duplicate_pairs(descriptions):
+    # every pair whose exact shingle jaccard reaches the threshold
+    sets = [set(shingles(text).tolist()) for text in descriptions]
+    return [
+        (a, b) for a, b in combinations(range(len(sets)), 2)
+        if sets[a] and sets[b] and len(sets[a] & sets[b]) / len(sets[a] | sets[b]) >= DUPLICATE_THRESHOLD
+    ]
+
+
+def test_clusters_recover_near_duplicate_pairs():
+    # 74 of the 75 pairs on the fixture postings when minhash was added
+    descriptions = pd.read_csv(FIXTURE_PATH, usecols=['description'])['description']
+    clusters = find_clusters(descriptions)
+    pairs = near_duplicate_pairs(descriptions)
+    recovered = sum(clusters[a] == clusters[b] for a, b in pairs)
+    assert len(pairs) == 75
+    assert recovered >= 74
+
+
+def test_one_per_cluster_keeps_the_first_selected_posting():
+    clusters = np.array([0, 0, 2, 0, 2, 5])
+    assert one_per_cluster(clusters).tolist() == [True, False, True, False, False, True]
+    selection = np.array([False, True, False, True, True, False])
+    assert one_per_cluster(clusters, selection).tolist() == [False, True, False, False, True, False]
@@ -0,0 +1,39 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from extract_skills import extract_skills
+from skill_index import SKILL_COLUMNS
+
+
+# frozen copy of the bundled postings, ingest.py keeps appending to the live csv
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'postings.csv')
+
+
+def test_agrees_with_the_bundled_skill_columns():
+    # 99.8% of cells when the extractor was written, the rest are keywords
+    # the original labelling read differently
+    postings = pd.read_csv(FIXTURE_PATH)
+    extracted = extract_skills(postings['description'], workers=1)
+    labelled = postings[SKILL_COLUMNS].fillna(False).astype(bool)
+    assert list(extracted.columns) == SKILL_COLUMNS
+    assert (extracted.to_numpy() == labelled.to_numpy()).mean() >= 0.9975
+
+
+def test_short_keywords_only_match_whole_words():
+    flags = extract_skills([
+        'Strong R and Git skills',
+        'Digital marketing for our partner brands',
+        None,
+    ], workers=1)
+    assert flags.loc[0, ['r', 'git']].tolist() == [True, True]
+    assert not flags.loc[1, ['r', 'git']].any()
+    assert not flags.loc[2].any()
+
+
+def test_pool_matches_a_single_process():
+    descriptions = pd.read_csv(FIXTURE_PATH, usecols=['description'])['description'].tolist() * 3
+    single = extract_skills(descriptions, workers=1)
+    pooled = extract_skills(descriptions, workers=2, chunk_size=100)
+    assert np.array_equal(single.to_numpy(), pooled.to_numpy())
@@ -0,0 +1,73 @@
+import os
+import threading
+
+import pandas as pd
+
+import ingest
+from aggregates import load_aggregates, save_aggregates, stream_aggregates
+from dataset import dataset_version, iter_postings, read_postings
+
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'postings.csv')
+STORED = 180
+
+
+def setup_store(tmp_path):
+    # the first postings of the fixture as the stored ones, with aggregates
+    # saved for them. the rest come back as a fresh scrape
+    postings = pd.read_csv(FIXTURE_PATH)
+    paths = {
+        'csv_path': str(tmp_path / 'postings.csv'),
+        'snapshot_path': str(tmp_path / 'postings.arrow'),
+        'aggregates_path': str(tmp_path / 'aggregates.json'),
+        'timeline_path': str(tmp_path / 'timeline'),
+    }
+    postings[:STORED].to_csv(paths['csv_path'], index=False)
+    version = dataset_version(paths['csv_path'], paths['snapshot_path'])
+    save_aggregates(stream_aggregates(iter_postings(paths['snapshot_path'])), version, paths['aggregates_path'])
+    # a few stored ids are scraped again and one is listed twice
+    batch = postings[STORED - 10:].drop(columns=['posted_on', 'scraped_at'])
+    batch = pd.concat([batch, batch[-1:]])
+    return paths, batch
+
+
+def recount(paths, tmp_path):
+    # aggregates counted from scratch, through the same json round trip
+    version = dataset_version(paths['csv_path'], paths['snapshot_path'])
+    path = str(tmp_path / 'recount.json')
+    save_aggregates(stream_aggregates(iter_postings(paths['snapshot_path'])), version, path)
+    return load_aggregates(version, path)
+
+
+def test_merged_aggregates_equal_a_recount(tmp_path):
+    paths, batch = setup_store(tmp_path)
+    added = ingest.ingest(batch, '2022-08-10', **paths)
+
+    assert added == len(pd.read_csv(FIXTURE_PATH)) - STORED
+    stored = load_aggregates(dataset_version(paths['csv_path'], paths['snapshot_path']), paths['aggregates_path'])
+    assert stored == recount(paths, tmp_path)
+
+
+def test_rebuild_waits_for_a_running_ingest(tmp_path, monkeypatch):
+    # a server rerun or precompute --watch between the csv append and the
+    # snapshot append sees a stale snapshot. its rebuild must wait for the
+    # ingest instead of adding the batch a second time
+    paths, batch = setup_store(tmp_path)
+    append_to_snapshot = ingest.append_to_snapshot
+    rebuild = threading.Thread(target=dataset_version, args=(paths['csv_path'], paths['snapshot_path']))
+
+    def append_during_rebuild(frame, snapshot_path):
+        rebuild.start()
+        rebuild.join(0.5)
+        assert rebuild.is_alive()
+        return append_to_snapshot(frame, snapshot_path)
+
+    monkeypatch.setattr(ingest, 'append_to_snapshot', append_during_rebuild)
+    ingest.ingest(batch, '2022-08-10', **paths)
+    rebuild.join()
+
+    ids = read_postings(paths['snapshot_path'], ['id'])['id']
+    assert ids.is_unique
+    assert len(ids) == len(pd.read_csv(paths['csv_path']))
+    stored = load_aggregates(dataset_version(paths['csv_path'], paths['snapshot_path']), paths['aggregates_path'])
+    assert stored == recount(paths, tmp_path)
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+import pytest
+from matplotlib.path import Path
+
+import regions
+from regions import OUTSIDE, assign_regions, load_regions
+
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'regions.geojson')
+BUNDLED_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'regions.geojson')
+POINTS = 200_000
+
+
+def contains_points(lat, lng, geojson):
+    # region of every point by matplotlib: inside some polygon's outer ring
+    # and none of its holes. the first region listed wins
+    points = np.column_stack([lng, lat])
+    codes = np.full(len(points), OUTSIDE, dtype=np.int32)
+    for region, feature in reversed(list(enumerate(geojson['features']))):
+        geometry = feature['geometry']
+        polygons = [geometry['coordinates']] if geometry['type'] == 'Polygon' else geometry['coordinates']
+        inside = np.zeros(len(points), dtype=bool)
+        for outer, *holes in polygons:
+            part = Path(outer).contains_points(points)
+            for hole in holes:
+                part &= ~Path(hole).contains_points(points)
+            inside |= part
+        codes[inside] = region
+    return codes
+
+
+@pytest.mark.parametrize('pair_batch', [regions.PAIR_BATCH, 10_000])
+def test_assign_regions_matches_contains_points(monkeypatch, pair_batch):
+    # a small batch splits the points over many ray casting passes
+    monkeypatch.setattr(regions, 'PAIR_BATCH', pair_batch)
+    geojson = load_regions(FIXTURE_PATH)
+    rng = np.random.default_rng(0)
+    lat = rng.uniform(-0.5, 3.0, POINTS)
+    lng = rng.uniform(-0.5, 4.5, POINTS)
+
+    codes = assign_regions(lat, lng, geojson)
+    expected = contains_points(lat, lng, geojson)
+    assert np.array_equal(codes, expected)
+    # every region, the holes and the space around them are all hit
+    assert set(np.unique(codes)) == {OUTSIDE, 0, 1, 2}
+
+
+def test_assign_regions_without_coordinates():
+    lat = np.array([np.nan, 1.0, 0.6])
+    lng = np.array([1.0, np.nan, 1.0])
+    assert assign_regions(lat, lng, load_regions(FIXTURE_PATH)).tolist() == [OUTSIDE, OUTSIDE, OUTSIDE]
+
+
+def test_bundled_regions_cover_their_capitals():
+    geojson = load_regions(BUNDLED_PATH)
+    names = [feature['properties']['name'] for feature in geojson['features']]
+    capitals = {'Jakarta Special Capital Region': (-6.2, 106.85), 'Bali': (-8.65, 115.22), 'East Java': (-7.25, 112.75)}
+    lat, lng = np.array(list(capitals.values())).T
+    assert [names[code] for code in assign_regions(lat, lng, geojson)] == list(capitals)
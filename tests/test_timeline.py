@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+
+import aggregates
+import ingest
+import timeline
+from dataset import dataset_version, read_postings
+from timeline import ensure_timeline, timeline_is_stale, trend
+
+
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), 'fixtures', 'postings.csv')
+
+
+def store(postings, tmp_path):
+    paths = {
+        'csv_path': str(tmp_path / 'postings.csv'),
+        'snapshot_path': str(tmp_path / 'postings.arrow'),
+        'timeline_path': str(tmp_path / 'timeline'),
+    }
+    postings.to_csv(paths['csv_path'], index=False)
+    return paths
+
+
+def replace_csv(postings, paths):
+    # a newer csv dropped in place of the stored one
+    postings.to_csv(paths['csv_path'], index=False)
+    mtime = os.path.getmtime(paths['snapshot_path']) + 1
+    os.utime(paths['csv_path'], (mtime, mtime))
+
+
+def trend_rows(paths):
+    return sum(period['rows'] for period in trend('month', path=paths['timeline_path']).values())
+
+
+def dated_rows(paths):
+    return int(read_postings(paths['snapshot_path'], ['posted_on'])['posted_on'].notna().sum())
+
+
+def ensure(paths):
+    return ensure_timeline(paths['timeline_path'], paths['csv_path'], paths['snapshot_path'])
+
+
+def test_replaced_csv_is_partitioned_again(tmp_path):
+    postings = pd.read_csv(FIXTURE_PATH)
+    paths = store(postings[:50], tmp_path)
+    ensure(paths)
+    assert trend_rows(paths) == dated_rows(paths)
+
+    replace_csv(postings, paths)
+    ensure(paths)
+    assert trend_rows(paths) == dated_rows(paths) == postings['posted_on'].notna().sum()
+
+
+def test_format_change_rebuilds_the_partitions(tmp_path, monkeypatch):
+    paths = store(pd.read_csv(FIXTURE_PATH), tmp_path)
+    ensure(paths)
+
+    monkeypatch.setattr(aggregates, 'AGGREGATES_FORMAT', aggregates.AGGREGATES_FORMAT + 1)
+    monkeypatch.setattr(timeline, 'AGGREGATES_FORMAT', aggregates.AGGREGATES_FORMAT)
+    assert timeline_is_stale(dataset_version(paths['csv_path'], paths['snapshot_path']), paths['timeline_path'])
+    ensure(paths)
+    assert trend_rows(paths) == dated_rows(paths)
+
+
+def test_ingest_keeps_the_timeline_current(tmp_path):
+    postings = pd.read_csv(FIXTURE_PATH)
+    paths = store(postings[:150], tmp_path)
+    ensure(paths)
+
+    batch = postings[150:].drop(columns=['posted_on', 'scraped_at'])
+    ingest.ingest(batch, '2022-08-10', aggregates_path=str(tmp_path / 'aggregates.json'), **paths)
+    assert not timeline_is_stale(dataset_version(paths['csv_path'], paths['snapshot_path']), paths['timeline_path'])
+    assert trend_rows(paths) == dated_rows(paths)
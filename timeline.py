@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+from aggregates import AGGREGATES_FORMAT, compute_aggregates, load_aggregates, merge_aggregates, save_aggregates
+from dataset import CSV_PATH, SNAPSHOT_PATH, TEXT_COLUMNS, append_to_snapshot, dataset_version, iter_postings, snapshot_lock, write_postings
+
+
+TIMELINE_PATH = './input_3.timeline'
+# partition of postings whose post_date isn't a relative date
+UNDATED = 'undated'
+RESOLUTIONS = ('week', 'month')
+# dataset version and aggregates format the partitions were written for
+STAMP = 'VERSION'
+
+
+def partition_keys(dates):
+    # postings are stored per week, split at month boundaries, so every
+    # partition lies in one week and one month and both trend resolutions
+    # are a merge of whole partitions. a partition is named after its first day
+    dates = pd.Series(dates)
+    week_start = dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    month_start = dates.dt.to_period('M').dt.start_time
+    keys = week_start.where(week_start > month_start, month_start).dt.strftime('%Y-%m-%d')
+    return keys.fillna(UNDATED).to_numpy()
+
+
+def partition_period(key, resolution):
+    if resolution == 'month':
+        return key[:7]
+    start = pd.Timestamp(key)
+    return (start - pd.Timedelta(days=start.weekday())).strftime('%Y-%m-%d')
+
+
+def add_postings(batch, path=TIMELINE_PATH):
+    # adds the batch to the partitions of its posted_on dates. only the
+    # partitions the batch falls in are rewritten, their aggregates updated
+    # with the batch's. descriptions stay in the main snapshot only
+    os.makedirs(path, exist_ok=True)
+    batch = batch.drop(columns=[column for column in TEXT_COLUMNS if column in batch])
+    keys = partition_keys(batch['posted_on'])
+
+    for key in np.unique(keys):
+        part = batch[keys == key]
+        postings_path, aggregates_path = os.path.join(path, f"{key}.arrow"), os.path.join(path, f"{key}.json")
+        if os.path.exists(postings_path):
+            append_to_snapshot(part, postings_path)
+        else:
+            write_postings(part, postings_path)
+        aggregates = load_aggregates(key, aggregates_path) or {}
+        save_aggregates(merge_aggregates(aggregates, compute_aggregates(part)), key, aggregates_path)
+    return len(batch)
+
+
+def timeline_stamp(path=TIMELINE_PATH):
+    stamp_path = os.path.join(path, STAMP)
+    if not os.path.exists(stamp_path):
+        return None
+    with open(stamp_path) as file:
+        return json.load(file)
+
+
+def stamp_timeline(version, path=TIMELINE_PATH):
+    # marks the partitions as holding every posting of `version`, written by
+    # build_timeline and by ingest.py after adding a batch
+    with open(os.path.join(path, STAMP), 'w') as file:
+        json.dump({'version': version, 'format': AGGREGATES_FORMAT}, file)
+
+
+def timeline_is_stale(version, path=TIMELINE_PATH):
+    return timeline_stamp(path) != {'version': version, 'format': AGGREGATES_FORMAT}
+
+
+def build_timeline(path=TIMELINE_PATH, csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    # partitions every stored posting from scratch by the date stored with
+    # it. the partitions are written next to the old ones and swapped in
+    # once stamped
+    with snapshot_lock(snapshot_path):
+        version = dataset_version(csv_path, snapshot_path)
+        tmp_path = path + '.tmp'
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+        for chunk in iter_postings(snapshot_path):
+            add_postings(chunk, tmp_path)
+        stamp_timeline(version, tmp_path)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        os.rename(tmp_path, path)
+    return path
+
+
+def ensure_timeline(path=TIMELINE_PATH, csv_path=CSV_PATH, snapshot_path=SNAPSHOT_PATH):
+    # the stored postings are partitioned again whenever they changed other
+    # than through ingest.py, which adds its batches and stamps the new
+    # version, or when the aggregates format changed
+    if timeline_is_stale(dataset_version(csv_path, snapshot_path), path):
+        with snapshot_lock(snapshot_path):
+            # checked again, another process may have rebuilt it meanwhile
+            if timeline_is_stale(dataset_version(csv_path, snapshot_path), path):
+                build_timeline(path, csv_path, snapshot_path)
+    return path
+
+
+def stored_partitions(path=TIMELINE_PATH):
+    # dated partition names, oldest first. only the directory is listed
+    if not os.path.isdir(path):
+        return []
+    return sorted(name[:-len('.json')] for name in os.listdir(path) if name.endswith('.json') and name != f"{UNDATED}.json")
+
+
+def periods(resolution='month', path=TIMELINE_PATH):
+    return sorted({partition_period(key, resolution) for key in stored_partitions(path)})
+
+
+def trend(resolution='month', start=None, end=None, path=TIMELINE_PATH):
+    # aggregates per week or month from `start` to `end` (periods as returned
+    # by periods), read from the partitions in range only
+    merged = {}
+    for key in stored_partitions(path):
+        period = partition_period(key, resolution)
+        if (start is not None and period < start) or (end is not None and period > end):
+            continue
+        aggregates = load_aggregates(key, os.path.join(path, f"{key}.json"))
+        if aggregates is not None:
+            merged[period] = merge_aggregates(merged.get(period, {}), aggregates)
+    return merged
+
+
+if __name__ == '__main__':
+    # python timeline.py [--rebuild]: partitions the stored postings when they
+    # changed, or from scratch with --rebuild
+    if '--rebuild' in sys.argv:
+        build_timeline()
+    else:
+        ensure_timeline()
+    for period, aggregates in trend('month').items():
+        print(period, aggregates['rows'])